@@ -0,0 +1,113 @@
+"""
+JWT authentication that resolves the user from token claims.
+
+Tokens issued by LoginView and RegisterView carry the user's role, name and
+email, so CachedJWTAuthentication can build ``request.user`` without
+selecting the users row on every request. TokenRefreshView re-reads the
+claims from the users row on every refresh, so they are never older than
+the last refresh.
+
+When a user's role, name, email or active flag changes, or the user is
+deleted, their current state is written to the cache for as long as a
+refresh token lives, and it takes precedence over whatever older tokens
+claim. Deactivated and deleted users are rejected. That override is only
+seen by every worker when the default cache is shared (Redis, Memcached,
+database or file). With a per-process cache (LocMemCache, the default)
+claims are not trusted: users are loaded from the database and cached for
+AUTH_USER_CACHE_SECONDS, which bounds how long another worker can act on an
+outdated role.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+CLAIMS = ('role', 'name', 'email')
+STATE_FIELDS = CLAIMS + ('is_active',)
+STATE_KEY = 'auth:user-state:{}'
+
+
+# Cache backends whose entries other worker processes can't see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def set_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+def tokens_for(user):
+    """Refresh and access tokens for ``user``, carrying its role, name and email."""
+    refresh = RefreshToken.for_user(user)
+    set_claims(refresh, user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+    }
+
+
+def user_state(user):
+    return {field: getattr(user, field) for field in STATE_FIELDS}
+
+
+def remember_user_state(user_id, state, timeout=None):
+    """Override token claims for ``user_id``; ``state`` of None marks the user as gone."""
+    if timeout is None:
+        timeout = int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+    cache.set(STATE_KEY.format(user_id), state or {'is_active': False}, timeout)
+
+
+def claims_trusted():
+    """Claims are only safe to trust when changes reach every worker through the cache."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def token_user(user_id, state):
+    """A User instance built from claims or cached state, without a database read."""
+    user = User(id=user_id, is_active=True, **{claim: state[claim] for claim in CLAIMS})
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user SELECT.
+
+    ``request.user`` is a User carrying only id, role, name and email; load
+    the row before changing or reading anything else about the user. Tokens
+    issued without the claims, and every token when the cache is
+    per-process, fall back to the database, and the result is cached for
+    AUTH_USER_CACHE_SECONDS.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as exc:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from exc
+        # simplejwt serialises the id as a string
+        user_id = User._meta.pk.to_python(user_id)
+
+        state = cache.get(STATE_KEY.format(user_id))
+        if state is None:
+            if not claims_trusted() or not all(claim in validated_token for claim in CLAIMS):
+                user = super().get_user(validated_token)
+                remember_user_state(user_id, user_state(user), settings.AUTH_USER_CACHE_SECONDS)
+                return user
+            state = {claim: validated_token[claim] for claim in CLAIMS}
+            state['is_active'] = True
+
+        if not state['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return token_user(user_id, state)
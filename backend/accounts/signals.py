@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from classes.models import Class, Enrollment
+from config.response_cache import invalidate
+from .authentication import STATE_FIELDS, remember_user_state, user_state
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def snapshot_token_state(sender, instance, **kwargs):
+    """Remember the fields tokens carry, to notice when a save changes them."""
+    instance._token_state = {field: instance.__dict__.get(field) for field in STATE_FIELDS}
+
+
+@receiver(post_save, sender=User)
+def refresh_token_state(sender, instance, created, update_fields=None, **kwargs):
+    """Cached state overrides the claims in tokens issued before the change."""
+    if created:
+        if instance.role == 'student':
+            invalidate(student_set=True)
+        return
+    if update_fields is not None and not set(update_fields) & set(STATE_FIELDS):
+        return
+    if any(field not in instance.__dict__ for field in STATE_FIELDS):
+        # Deferred fields: read the saved values rather than guess
+        state = User.objects.filter(pk=instance.pk).values(*STATE_FIELDS).first()
+    else:
+        state = user_state(instance)
+    if state != instance._token_state:
+        remember_user_state(instance.pk, state)
+        invalidate_user_responses(instance, instance._token_state, state)
+    instance._token_state = state
+
+
+def invalidate_user_responses(user, old, new):
+    """
+    Cached dashboards count students, class lists show teacher names and
+    attendance lists show student names and emails.
+    """
+    if old.get('role') != new['role'] and 'student' in (old.get('role'), new['role']):
+        invalidate(student_set=True)
+    if (old.get('name'), old.get('email')) == (new['name'], new['email']):
+        return
+    if new['role'] == 'teacher':
+        invalidate(
+            classes=Class.objects.filter(teacher=user).values_list('id', flat=True),
+            teachers=[user.pk],
+        )
+    elif new['role'] == 'student':
+        invalidate(
+            classes=Enrollment.objects.filter(student=user).values_list('class_obj_id', flat=True),
+            students=[user.pk],
+        )
+
+
+@receiver(post_delete, sender=User)
+def forget_token_state(sender, instance, **kwargs):
+    remember_user_state(instance.pk, None)
+    if instance.role == 'student':
+        invalidate(student_set=True)
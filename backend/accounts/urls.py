@@ -1,6 +1,5 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
-from .views import RegisterView, LoginView, ProfileView, UserListView
+from .views import RegisterView, LoginView, ProfileView, TokenRefreshView, UserListView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
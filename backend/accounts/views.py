@@ -2,10 +2,11 @@ from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, get_user_model
+from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 
-from .serializers import RegisterSerializer, UserSerializer, LoginSerializer
+from .authentication import tokens_for
+from .serializers import ClaimsTokenRefreshSerializer, RegisterSerializer, UserSerializer, LoginSerializer
 
 User = get_user_model()
 
@@ -19,13 +20,9 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-            }
+            'tokens': tokens_for(user),
         }, status=status.HTTP_201_CREATED)
 
 
@@ -45,13 +42,9 @@ class LoginView(APIView):
                 {'error': 'Invalid email or password'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-            }
+            'tokens': tokens_for(user),
         })
 
 
@@ -61,7 +54,8 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from token claims; load the full row
+        return User.objects.get(pk=self.request.user.pk)
 
 
 class UserListView(generics.ListAPIView):
@@ -75,3 +69,8 @@ class UserListView(generics.ListAPIView):
         if role:
             queryset = queryset.filter(role=role)
         return queryset
+
+
+class TokenRefreshView(BaseTokenRefreshView):
+    """Refresh tokens, re-reading role/name/email claims from the database."""
+    serializer_class = ClaimsTokenRefreshSerializer
@@ -0,0 +1,112 @@
+"""
+Absent marking for closed sessions.
+
+A ClassSession is over once every QR code issued for it has expired (and
+stopped rotating) at least SESSION_CLOSE_GRACE_SECONDS ago, or once its day
+has passed. Closing it writes one ``absent`` row for each enrolled student
+who never scanned (the set difference of the roster and the session's
+attendance), bumps the day's summary, and stamps the session's ``ended_at``
+so it isn't visited again.
+
+Scans that still arrive for a closed session (offline replays, a code
+issued later the same day) replace the student's absent row.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from classes.models import Enrollment
+from config.response_cache import invalidate
+from .models import Attendance, ClassSession
+from .realtime import publish
+from .rollups import record_attendance
+
+logger = logging.getLogger(__name__)
+
+# Attempts per session when a scan lands between reading and inserting
+CLOSE_ATTEMPTS = 3
+
+
+def sessions_to_close(now=None, day=None):
+    """
+    Open sessions that are over, oldest first.
+
+    Looks back SESSION_CLOSE_LOOKBACK_DAYS, or only at ``day`` if given.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    idle_since = now - timedelta(seconds=settings.SESSION_CLOSE_GRACE_SECONDS)
+    sessions = ClassSession.objects.filter(ended_at__isnull=True)
+    if day is not None:
+        sessions = sessions.filter(date=day)
+    else:
+        sessions = sessions.filter(date__gte=today - timedelta(days=settings.SESSION_CLOSE_LOOKBACK_DAYS))
+
+    # Sessions run with signed codes have no token rows and close with their day
+    codes_done = (
+        Q(last_expiry__lte=idle_since)
+        & (Q(rotating_until__isnull=True) | Q(rotating_until__lte=idle_since))
+    )
+    return list(
+        sessions.annotate(last_expiry=Max('qr_tokens__expires_at'), rotating_until=Max('qr_tokens__rotate_until'))
+        .filter(Q(date__lt=today) | codes_done)
+        .order_by('date', 'class_obj_id')
+    )
+
+
+def close_session(session, now=None):
+    """
+    Mark enrolled students without attendance in ``session`` absent and close
+    it. Returns the number of absent rows written.
+    """
+    now = now or timezone.now()
+    class_id, day = session.class_obj_id, session.date
+    for attempt in range(CLOSE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                roster = set(Enrollment.objects.filter(class_obj_id=class_id).values_list('student_id', flat=True))
+                marked = set(
+                    Attendance.objects.filter(class_obj_id=class_id, attendance_date=day)
+                    .values_list('student_id', flat=True)
+                )
+                absent = sorted(roster - marked)
+                Attendance.objects.bulk_create(
+                    [
+                        Attendance(
+                            student_id=student_id, class_obj_id=class_id, attendance_date=day,
+                            session=session, status='absent',
+                        )
+                        for student_id in absent
+                    ],
+                    batch_size=settings.SESSION_CLOSE_BATCH_SIZE,
+                )
+                if absent:
+                    record_attendance(class_id, day, ['absent'] * len(absent), enrolled_count=len(roster))
+                    invalidate(classes=[class_id], students=absent)
+                ClassSession.objects.filter(pk=session.pk).update(ended_at=now)
+        except IntegrityError:
+            # A late scan for one of the students got in first; recompute
+            if attempt == CLOSE_ATTEMPTS - 1:
+                raise
+            continue
+        break
+
+    if absent:
+        publish(class_id, 'session_closed', attendance_date=day.isoformat(), absent=len(absent))
+    return len(absent)
+
+
+def close_finished_sessions(now=None, day=None):
+    """Close every finished session (see ``sessions_to_close``); returns ``(sessions, absent_rows)``."""
+    now = now or timezone.now()
+    sessions = sessions_to_close(now, day)
+    marked = 0
+    for session in sessions:
+        marked += close_session(session, now)
+    if sessions:
+        logger.info('Closed %d sessions, marked %d absences', len(sessions), marked)
+    return len(sessions), marked
@@ -1,5 +1,18 @@
+from collections import defaultdict
+
 from django.contrib import admin
-from .models import Attendance, QRToken
+from django.db import transaction
+
+from config.response_cache import invalidate
+from .models import (
+    Attendance,
+    AttendanceArchive,
+    AttendanceDailySummary,
+    ClassSession,
+    QRToken,
+    ScanAnomaly,
+)
+from .rollups import record_attendance, remove_attendance
 
 
 @admin.register(Attendance)
@@ -8,7 +21,67 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_filter = ('status', 'attendance_date', 'class_obj')
     search_fields = ('student__name', 'student__email')
 
+    # Rows edited here bypass the scan path, so the daily summaries are
+    # adjusted directly. Attendance has no post_delete receiver (it would cost
+    # the reaper its fast bulk delete), so deletions also invalidate cached
+    # responses directly.
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old = None
+            if change:
+                old = Attendance.objects.filter(pk=obj.pk).values_list(
+                    'class_obj_id', 'attendance_date', 'status',
+                ).first()
+            super().save_model(request, obj, form, change)
+            new = (obj.class_obj_id, obj.attendance_date, obj.status)
+            if old != new:
+                if old is not None:
+                    remove_attendance(*old)
+                record_attendance(*new)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            remove_attendance(obj.class_obj_id, obj.attendance_date, obj.status)
+            invalidate(classes=[obj.class_obj_id], students=[obj.student_id])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list('class_obj_id', 'student_id', 'attendance_date', 'status'))
+            super().delete_queryset(request, queryset)
+            sessions = defaultdict(list)
+            for class_id, _, attendance_date, status in rows:
+                sessions[(class_id, attendance_date)].append(status)
+            for (class_id, attendance_date), statuses in sessions.items():
+                remove_attendance(class_id, attendance_date, statuses)
+            invalidate(classes={row[0] for row in rows}, students={row[1] for row in rows})
+
+
+@admin.register(ClassSession)
+class ClassSessionAdmin(admin.ModelAdmin):
+    list_display = ('class_obj', 'date', 'started_at', 'ended_at')
+    list_filter = ('date', 'class_obj')
+
 
 @admin.register(QRToken)
 class QRTokenAdmin(admin.ModelAdmin):
     list_display = ('class_obj', 'token', 'created_at', 'expires_at')
+
+
+@admin.register(AttendanceDailySummary)
+class AttendanceDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ('class_obj', 'date', 'present_count', 'late_count', 'absent_count', 'enrolled_count')
+    list_filter = ('date', 'class_obj')
+
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(admin.ModelAdmin):
+    list_display = ('student', 'class_obj', 'present_count', 'late_count', 'absent_count', 'first_date', 'last_date')
+    list_filter = ('class_obj',)
+
+
+@admin.register(ScanAnomaly)
+class ScanAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('class_obj', 'kind', 'value', 'student_count', 'occurrences', 'first_date', 'last_date')
+    list_filter = ('kind', 'class_obj')
+    search_fields = ('value',)
@@ -0,0 +1,181 @@
+"""
+Incremental proxy-attendance analysis.
+
+Each pass reads only the attendance rows added since the previous pass
+(tracked by id in AnalysisCursor). It records every device -> student and
+IP -> student pairing per class and day in ``attendance_scan_links``, a
+compact index that outlives archived attendance. It then re-evaluates just
+the devices, IP addresses and class-days those rows touched, looking for:
+
+* one device used by several students of a class (on different days, since
+  same-day reuse is already rejected at scan time);
+* many students of a class scanning from one IP address on the same day;
+* several students scanning from the same spot, to about a metre, within
+  ANOMALY_CLUSTER_SECONDS of each other.
+
+Findings are upserted into ScanAnomaly, one row per class and pattern.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AnalysisCursor, Attendance, ScanAnomaly, ScanLink
+
+CURSOR_NAME = 'scan_anomalies'
+# Rows this recent may still have uncommitted neighbours with lower ids
+SETTLE_SECONDS = 30
+# Decimal places of latitude/longitude that count as "the same spot" (~1m)
+CLUSTER_PRECISION = 5
+MAX_STORED_STUDENTS = 200
+
+ROW_FIELDS = (
+    'id', 'student_id', 'class_obj_id', 'attendance_date',
+    'device_id', 'ip_address', 'latitude', 'longitude', 'marked_at',
+)
+
+
+def analyze_new_scans(batch_size=None, now=None):
+    """
+    Analyse attendance added since the last pass.
+
+    Returns ``(rows_read, anomalies_flagged)``. Each batch and the cursor
+    advance commit together, so an interrupted pass resumes where it stopped.
+    """
+    batch_size = batch_size or settings.ANOMALY_BATCH_SIZE
+    settled = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+
+    read = flagged = 0
+    while True:
+        with transaction.atomic():
+            cursor, _ = AnalysisCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+            rows = list(
+                Attendance.objects.filter(id__gt=cursor.last_id)
+                .order_by('id')
+                .values_list(*ROW_FIELDS)[:batch_size]
+            )
+            fetched = len(rows)
+            # Stop at the first unsettled row so none before it is skipped
+            for position, row in enumerate(rows):
+                if row[-1] > settled:
+                    rows = rows[:position]
+                    break
+            if not rows:
+                break
+            flagged += analyze_rows(rows)
+            cursor.last_id = rows[-1][0]
+            cursor.save(update_fields=['last_id', 'updated_at'])
+        read += len(rows)
+        if len(rows) < fetched or fetched < batch_size:
+            break
+    return read, flagged
+
+
+def analyze_rows(rows):
+    """Index a batch of attendance rows (ROW_FIELDS tuples) and re-check what they touched."""
+    links = []
+    located_days = set()
+    for _, student_id, class_id, day, device_id, ip_address, latitude, longitude, _ in rows:
+        if device_id:
+            links.append(ScanLink(class_obj_id=class_id, date=day, kind='device', value=device_id, student_id=student_id))
+        if ip_address:
+            links.append(ScanLink(class_obj_id=class_id, date=day, kind='ip', value=ip_address, student_id=student_id))
+        if latitude is not None and longitude is not None:
+            located_days.add((class_id, day))
+    ScanLink.objects.bulk_create(links, ignore_conflicts=True, batch_size=1000)
+
+    since = min(row[3] for row in rows) - timedelta(days=settings.ANOMALY_WINDOW_DAYS)
+    touched = {(link.class_obj_id, link.kind, link.value) for link in links}
+    return _check_links(touched, since) + _check_clusters(located_days)
+
+
+def _check_links(touched, since):
+    if not touched:
+        return 0
+    # key -> day -> students
+    seen = defaultdict(lambda: defaultdict(set))
+    for class_id, kind, value, day, student_id in ScanLink.objects.filter(
+        class_obj_id__in={class_id for class_id, _, _ in touched},
+        value__in={value for _, _, value in touched},
+        date__gte=since,
+    ).values_list('class_obj_id', 'kind', 'value', 'date', 'student_id'):
+        if (class_id, kind, value) in touched:
+            seen[(class_id, kind, value)][day].add(student_id)
+
+    flagged = 0
+    for (class_id, kind, value), days in seen.items():
+        if kind == 'device':
+            students = set().union(*days.values())
+            if len(students) >= settings.ANOMALY_DEVICE_MIN_STUDENTS:
+                _flag(class_id, 'shared_device', value, students, days)
+                flagged += 1
+        else:
+            crowded = {day: students for day, students in days.items()
+                       if len(students) >= settings.ANOMALY_IP_MIN_STUDENTS}
+            if crowded:
+                _flag(class_id, 'shared_ip', value, set().union(*crowded.values()), crowded)
+                flagged += 1
+    return flagged
+
+
+def _check_clusters(located_days):
+    if not located_days:
+        return 0
+    # (class, day, spot) -> [(marked_at, student)]
+    spots = defaultdict(list)
+    for class_id, day, student_id, latitude, longitude, marked_at in Attendance.objects.filter(
+        class_obj_id__in={class_id for class_id, _ in located_days},
+        attendance_date__in={day for _, day in located_days},
+        latitude__isnull=False,
+        longitude__isnull=False,
+    ).values_list('class_obj_id', 'attendance_date', 'student_id', 'latitude', 'longitude', 'marked_at'):
+        if (class_id, day) in located_days:
+            spot = (round(latitude, CLUSTER_PRECISION), round(longitude, CLUSTER_PRECISION))
+            spots[(class_id, day, spot)].append((marked_at, student_id))
+
+    window = timedelta(seconds=settings.ANOMALY_CLUSTER_SECONDS)
+    flagged = 0
+    for (class_id, day, (latitude, longitude)), scans in spots.items():
+        if len(scans) < settings.ANOMALY_CLUSTER_MIN_STUDENTS:
+            continue
+        scans.sort()
+        clustered = set()
+        start = 0
+        for end in range(len(scans)):
+            while scans[end][0] - scans[start][0] > window:
+                start += 1
+            if end - start + 1 >= settings.ANOMALY_CLUSTER_MIN_STUDENTS:
+                clustered.update(student for _, student in scans[start:end + 1])
+        if clustered:
+            value = f'{day.isoformat()} {latitude:.{CLUSTER_PRECISION}f},{longitude:.{CLUSTER_PRECISION}f}'
+            _flag(class_id, 'location_cluster', value, clustered, {day})
+            flagged += 1
+    return flagged
+
+
+def _flag(class_id, kind, value, students, days):
+    """Create or widen the anomaly for this class and pattern."""
+    anomaly = ScanAnomaly.objects.select_for_update().filter(
+        class_obj_id=class_id, kind=kind, value=value,
+    ).first()
+    if anomaly is None:
+        anomaly = ScanAnomaly(class_obj_id=class_id, kind=kind, value=value,
+                              first_date=min(days), last_date=max(days))
+    else:
+        students = students | set(anomaly.student_ids)
+    anomaly.student_ids = sorted(students)[:MAX_STORED_STUDENTS]
+    anomaly.student_count = max(len(students), anomaly.student_count)
+    anomaly.occurrences = max(len(days), anomaly.occurrences)
+    anomaly.first_date = min(anomaly.first_date, min(days))
+    anomaly.last_date = max(anomaly.last_date, max(days))
+    anomaly.save()
+
+
+def reset_analysis():
+    """Forget all links, anomalies and progress so the next pass starts from the first row."""
+    with transaction.atomic():
+        ScanLink.objects.all().delete()
+        ScanAnomaly.objects.all().delete()
+        AnalysisCursor.objects.filter(name=CURSOR_NAME).delete()
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_started
+
+        from . import checks, signals  # noqa: F401
+
+        if settings.QR_ROTATION_IN_PROCESS:
+            request_started.connect(signals.start_rotation_worker, dispatch_uid='attendance_rotation_worker')
+        if settings.REAPER_IN_PROCESS:
+            request_started.connect(signals.start_reaper_worker, dispatch_uid='attendance_reaper_worker')
+        if settings.SESSION_CLOSE_IN_PROCESS:
+            request_started.connect(signals.start_session_close_worker, dispatch_uid='attendance_session_close_worker')
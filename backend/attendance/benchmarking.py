@@ -0,0 +1,137 @@
+"""
+Helpers shared by the load-test and benchmark management commands.
+
+Seeded rows are tagged with a per-run prefix so a run can clean up after
+itself without touching real data.
+"""
+import json
+import math
+import threading
+import urllib.error
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+
+from accounts.authentication import tokens_for
+from classes.models import Class, Enrollment
+
+User = get_user_model()
+
+
+class SeededData:
+    """Users, classes and enrollments created for one benchmark run."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.teacher = None
+        self.students = []
+        self.classes = []
+
+    def cleanup(self):
+        # Classes cascade to enrollments, tokens and attendance
+        Class.objects.filter(id__in=[c.id for c in self.classes]).delete()
+        User.objects.filter(email__startswith=self.prefix).delete()
+
+
+def seed(num_students, num_classes=1, enroll=True, prefix=None):
+    """Create a teacher, students and classes through the ORM."""
+    data = SeededData(prefix or f'bench-{uuid.uuid4().hex[:8]}-')
+
+    data.teacher = User.objects.create_user(
+        email=f'{data.prefix}teacher@example.invalid', name='Bench Teacher', role='teacher',
+    )
+    students = []
+    for i in range(num_students):
+        student = User(email=f'{data.prefix}student{i}@example.invalid', name=f'Bench Student {i}', role='student')
+        student.set_unusable_password()  # skip hashing; benchmarks authenticate with JWTs
+        students.append(student)
+    User.objects.bulk_create(students, batch_size=1000)
+    data.students = list(User.objects.filter(email__startswith=f'{data.prefix}student').order_by('id'))
+
+    data.classes = [
+        Class.objects.create(subject_name=f'{data.prefix}class{i}', teacher=data.teacher)
+        for i in range(num_classes)
+    ]
+    if enroll:
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=s, class_obj=c) for c in data.classes for s in data.students],
+            batch_size=1000,
+        )
+    return data
+
+
+def api_client(user):
+    """Django test client authenticated as ``user`` with a real access token."""
+    host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+    token = tokens_for(user)['access']
+    return Client(SERVER_NAME=host, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class LiveServerClient:
+    """Talks to a running server over HTTP; ``request`` matches ``TestClientTransport``."""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip('/')
+        self.authorization = f'Bearer {tokens_for(user)["access"]}'
+
+    def request(self, method, path, data=None):
+        """Send the request, read the whole body, and return the status code."""
+        body = json.dumps(data).encode() if data is not None else None
+        headers = {'Authorization': self.authorization}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+
+class TestClientTransport:
+    """In-process requests through the Django test client."""
+
+    def __init__(self, user):
+        self.client = api_client(user)
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            response = self.client.post(path, data, content_type='application/json')
+        else:
+            response = self.client.get(path)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_threads(target, args_list):
+    """Start one thread per argument tuple, released together, and wait for all."""
+    barrier = threading.Barrier(len(args_list))
+
+    def worker(*args):
+        try:
+            barrier.wait()
+            target(*args)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from accounts.authentication import PROCESS_LOCAL_CACHES
+
+
+@register()
+def check_signed_token_cache(app_configs, **kwargs):
+    """Signed QR codes keep their revocations and current codes in the default cache."""
+    if settings.QR_TOKEN_MODE != 'signed' or settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        "QR_TOKEN_MODE = 'signed' needs a default cache shared between processes.",
+        hint=(
+            'With a per-process cache other workers keep accepting rotated-out codes and '
+            "can't show the active one. Set CACHE_BACKEND to Redis or Memcached, or, if a "
+            "single process serves requests, add 'attendance.E001' to SILENCED_SYSTEM_CHECKS."
+        ),
+        id='attendance.E001',
+    )]
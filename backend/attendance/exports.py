@@ -0,0 +1,194 @@
+"""
+Streaming attendance exports.
+
+Rows are read with a server-side cursor as plain tuples and encoded in
+chunks, so memory use stays flat regardless of how many rows are exported.
+CSV and NDJSON are always available; Arrow IPC and Parquet need pyarrow.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: only needed for the columnar formats
+    pyarrow = None
+
+# Column order matches CSV_HEADER
+EXPORT_FIELDS = (
+    'student__name',
+    'student__email',
+    'class_obj__subject_name',
+    'attendance_date',
+    'status',
+    'marked_at',
+)
+CSV_HEADER = ['Student Name', 'Email', 'Class', 'Date', 'Status', 'Marked At']
+
+# Rows fetched per round trip from the server-side cursor
+CURSOR_CHUNK_SIZE = 2000
+# Rows encoded into each chunk sent to the client
+ROWS_PER_CHUNK = 500
+# Rows per Arrow record batch / Parquet row group
+COLUMNAR_BATCH_SIZE = 65536
+
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+def export_rows(queryset, chunk_size=CURSOR_CHUNK_SIZE):
+    """Yield export rows as tuples straight from a server-side cursor."""
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def csv_chunks(rows, rows_per_chunk=ROWS_PER_CHUNK):
+    """Encode rows as CSV, yielding one bytes chunk per ``rows_per_chunk`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    pending = 0
+
+    for name, email, class_name, attendance_date, status, marked_at in rows:
+        writer.writerow([
+            name,
+            email,
+            class_name,
+            attendance_date,
+            status,
+            marked_at.strftime('%Y-%m-%d %H:%M:%S'),
+        ])
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(rows, rows_per_chunk=ROWS_PER_CHUNK):
+    """Encode rows as newline-delimited JSON objects with ISO dates and timestamps."""
+    lines = []
+    for name, email, class_name, attendance_date, status, marked_at in rows:
+        lines.append(json.dumps({
+            'student_name': name,
+            'student_email': email,
+            'class_name': class_name,
+            'attendance_date': attendance_date.isoformat(),
+            'status': status,
+            'marked_at': marked_at.isoformat(),
+        }))
+        if len(lines) >= rows_per_chunk:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def arrow_schema():
+    return pyarrow.schema([
+        ('student_name', pyarrow.string()),
+        ('student_email', pyarrow.string()),
+        ('class_name', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+        ('attendance_date', pyarrow.date32()),
+        ('status', pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+        ('marked_at', pyarrow.timestamp('us', tz='UTC')),
+    ])
+
+
+def record_batches(rows, batch_size=COLUMNAR_BATCH_SIZE):
+    """Transpose row tuples into typed Arrow record batches of ``batch_size`` rows."""
+    schema = arrow_schema()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        columns = list(zip(*batch))
+        arrays = [
+            pyarrow.array(values, type=field.type)
+            if not pyarrow.types.is_dictionary(field.type)
+            else pyarrow.array(values, type=pyarrow.string()).dictionary_encode().cast(field.type)
+            for field, values in zip(schema, columns)
+        ]
+        yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_chunks(rows):
+    """Encode rows as an Arrow IPC stream, one chunk per record batch."""
+    sink = _ChunkSink()
+    with pyarrow.ipc.new_stream(sink, arrow_schema()) as writer:
+        for batch in record_batches(rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_chunks(rows):
+    """Encode rows as a Parquet file, one chunk per row group."""
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, arrow_schema(), compression='zstd') as writer:
+        for batch in record_batches(rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+# format name -> (encoder, content type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv', 'csv', False),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson', 'ndjson', False),
+    'arrow': (arrow_chunks, 'application/vnd.apache.arrow.stream', 'arrows', True),
+    'parquet': (parquet_chunks, 'application/vnd.apache.parquet', 'parquet', True),
+}
+
+
+def streaming_export_response(request, chunks, content_type, filename):
+    """
+    Wrap encoded chunks in a StreamingHttpResponse, gzip-encoding them when
+    the client accepts it.
+    """
+    gzipped = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    if gzipped:
+        chunks = compress_sequence(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,60 @@
+"""
+Geodesic distances for geofence checks.
+
+Single scans use the scalar ``haversine_distance``. Audits and bulk checks
+pass whole coordinate columns to ``distances_from``/``fence_outliers``, which
+evaluate them in one vectorized call when NumPy is installed and fall back
+to a Python loop otherwise.
+"""
+import math
+
+try:
+    import numpy
+except ImportError:  # optional: only speeds up bulk checks
+    numpy = None
+
+EARTH_RADIUS_METERS = 6371000
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance in meters between two GPS coordinates."""
+    R = EARTH_RADIUS_METERS
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def distances_from(latitude, longitude, latitudes, longitudes):
+    """
+    Distances in meters from one point to each of many points.
+
+    Returns a float64 array with NumPy, else a list.
+    """
+    if numpy is None:
+        return [haversine_distance(latitude, longitude, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+
+    phi1 = math.radians(latitude)
+    phi2 = numpy.radians(numpy.asarray(latitudes, dtype=numpy.float64))
+    lambda2 = numpy.radians(numpy.asarray(longitudes, dtype=numpy.float64))
+    a = (
+        numpy.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * numpy.cos(phi2) * numpy.sin((lambda2 - math.radians(longitude)) / 2) ** 2
+    )
+    # arcsin(sqrt(a)) is the same angle as atan2(sqrt(a), sqrt(1 - a)); clip
+    # guards against a creeping past 1.0 for antipodal points
+    return 2 * EARTH_RADIUS_METERS * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0.0, 1.0)))
+
+
+def fence_outliers(latitude, longitude, radius_meters, latitudes, longitudes):
+    """``(index, distance)`` for every point outside the fence, farthest first."""
+    distances = distances_from(latitude, longitude, latitudes, longitudes)
+    if numpy is None:
+        outliers = [(i, distance) for i, distance in enumerate(distances) if distance > radius_meters]
+        return sorted(outliers, key=lambda outlier: outlier[1], reverse=True)
+    indexes = numpy.flatnonzero(distances > radius_meters)
+    indexes = indexes[numpy.argsort(distances[indexes])[::-1]]
+    return [(int(i), float(distances[i])) for i in indexes]
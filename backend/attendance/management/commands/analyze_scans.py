@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.anomalies import analyze_new_scans, reset_analysis
+
+
+class Command(BaseCommand):
+    help = 'Index new attendance by device and IP and flag proxy-attendance patterns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Attendance rows per transaction')
+        parser.add_argument('--reset', action='store_true',
+                            help='Drop existing links and anomalies and re-analyse from the first row')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, with this many seconds between passes')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_analysis()
+        while True:
+            close_old_connections()
+            read, flagged = analyze_new_scans(batch_size=options['batch_size'])
+            self.stdout.write(f'Analysed {read} attendance rows, flagged or updated {flagged} anomalies')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,119 @@
+import csv
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+
+from attendance.benchmarking import api_client, seed
+from attendance.models import Attendance
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def legacy_export(queryset):
+    """The in-memory export ExportAttendanceView used to build, for comparison."""
+    response = HttpResponse(content_type='text/csv')
+    writer = csv.writer(response)
+    writer.writerow(['Student Name', 'Email', 'Class', 'Date', 'Status', 'Marked At'])
+    for record in queryset.select_related('student', 'class_obj'):
+        writer.writerow([
+            record.student.name,
+            record.student.email,
+            record.class_obj.subject_name,
+            record.attendance_date,
+            record.status,
+            record.marked_at.strftime('%Y-%m-%d %H:%M:%S'),
+        ])
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark /api/attendance/export/ on a large seeded class, reporting '
+        'time-to-first-byte, total time and peak memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--format', default='csv', choices=['csv', 'ndjson', 'arrow', 'parquet'])
+        parser.add_argument('--gzip', action='store_true', help='Request a gzip-encoded export')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Also run the old in-memory export afterwards for comparison')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        days = -(-options['rows'] // options['students'])
+        data = seed(options['students'], enroll=False)
+        class_obj = data.classes[0]
+        try:
+            start = date.today() - timedelta(days=days)
+            seeded = 0
+            for day in range(days):
+                batch = [
+                    Attendance(
+                        student=student,
+                        class_obj=class_obj,
+                        attendance_date=start + timedelta(days=day),
+                        status='present',
+                    )
+                    for student in data.students[:options['rows'] - seeded]
+                ]
+                Attendance.objects.bulk_create(batch, batch_size=5000)
+                seeded += len(batch)
+            self.stdout.write(f'seeded {seeded} attendance rows; peak RSS so far {peak_rss_mb():.1f} MB')
+
+            client = api_client(data.teacher)
+            headers = {'HTTP_ACCEPT_ENCODING': 'gzip'} if options['gzip'] else {}
+
+            rss_before = peak_rss_mb()
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get(
+                '/api/attendance/export/',
+                {'class_id': class_obj.id, 'format': options['format']},
+                **headers,
+            )
+            chunks = iter(response.streaming_content)
+            first = next(chunks)
+            ttfb = time.perf_counter() - started
+            size = len(first) + sum(len(chunk) for chunk in chunks)
+            elapsed = time.perf_counter() - started
+            _, heap_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            response.close()
+
+            self.stdout.write(
+                f'streaming {options["format"]} export: ttfb={ttfb * 1000:.1f}ms total={elapsed:.2f}s '
+                f'bytes={size} encoding={response.get("Content-Encoding", "identity")} '
+                f'python heap peak={heap_peak / 1e6:.1f} MB '
+                f'RSS growth={peak_rss_mb() - rss_before:.1f} MB'
+            )
+
+            if options['legacy']:
+                rss_before = peak_rss_mb()
+                tracemalloc.start()
+                started = time.perf_counter()
+                response = legacy_export(
+                    Attendance.objects.filter(class_obj=class_obj).order_by('attendance_date', 'student__name')
+                )
+                elapsed = time.perf_counter() - started
+                _, heap_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'legacy export:    ttfb={elapsed * 1000:.1f}ms total={elapsed:.2f}s '
+                    f'bytes={len(response.content)} '
+                    f'python heap peak={heap_peak / 1e6:.1f} MB '
+                    f'RSS growth={peak_rss_mb() - rss_before:.1f} MB'
+                )
+        finally:
+            if not options['keep']:
+                data.cleanup()
@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.geo import distances_from, haversine_distance, numpy
+
+
+class Command(BaseCommand):
+    help = 'Compare scalar and vectorized geofence checks over many points.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=1_000_000)
+        parser.add_argument('--radius', type=int, default=100, help='Fence radius in meters')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        centre = (27.7172, 85.3240)
+        radius = options['radius']
+        rng = random.Random(options['seed'])
+        # Points scattered roughly ±500m around the fence centre
+        latitudes = [centre[0] + rng.uniform(-0.0045, 0.0045) for _ in range(options['points'])]
+        longitudes = [centre[1] + rng.uniform(-0.005, 0.005) for _ in range(options['points'])]
+
+        def scalar():
+            return sum(
+                haversine_distance(centre[0], centre[1], lat, lon) > radius
+                for lat, lon in zip(latitudes, longitudes)
+            )
+
+        outside = self._report('scalar haversine', scalar, options['points'])
+        if numpy is None:
+            self.stdout.write('numpy is not installed; the vectorized path falls back to the scalar loop')
+            return
+
+        lat_array = numpy.array(latitudes)
+        lon_array = numpy.array(longitudes)
+        vectorized = self._report(
+            'vectorized (arrays)',
+            lambda: int((distances_from(*centre, lat_array, lon_array) > radius).sum()),
+            options['points'],
+        )
+        self._report(
+            'vectorized (lists)',
+            lambda: int((distances_from(*centre, latitudes, longitudes) > radius).sum()),
+            options['points'],
+        )
+        if vectorized != outside:
+            self.stderr.write(f'outside counts differ: scalar={outside} vectorized={vectorized}')
+
+    def _report(self, label, func, points):
+        started = time.perf_counter()
+        outside = func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:22} {elapsed * 1000:10.1f}ms  {points / elapsed:14,.0f} points/s  outside={outside}'
+        )
+        return outside
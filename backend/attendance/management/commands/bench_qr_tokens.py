@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.benchmarking import seed
+from attendance.models import QRToken
+from attendance.scanning import scan_cache
+from attendance import signed_tokens
+
+
+class Command(BaseCommand):
+    help = 'Compare token validations per second: QRToken lookups against signed codes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        data = seed(0)
+        try:
+            class_obj = data.classes[0]
+            row = QRToken.objects.create(
+                class_obj=class_obj, created_by=data.teacher, latitude=27.7, longitude=85.3,
+            )
+            signed = signed_tokens.issue(class_obj.id, latitude=27.7, longitude=85.3)
+            self.stdout.write(f'signed code is {len(signed)} characters')
+
+            def database():
+                token = QRToken.objects.select_related('class_obj').get(token=row.token)
+                return token.is_expired
+
+            def signed_verify():
+                token = signed_tokens.verify(signed)
+                return signed_tokens.denylist.expires_at(token)
+
+            def signed_cached():
+                # What validate_scan does: verify plus the cached class name
+                return scan_cache.get_token(signed).is_expired
+
+            iterations = options['iterations']
+            self._report('QRToken.objects.get', database, iterations)
+            self._report('signed verify', signed_verify, iterations)
+            self._report('signed via scan cache', signed_cached, iterations)
+        finally:
+            scan_cache.clear()
+            if not options['keep']:
+                data.cleanup()
+
+    def _report(self, label, func, iterations):
+        func()  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:24} {iterations / elapsed:12,.0f} scans/s  {elapsed / iterations * 1e6:8.1f}µs/scan'
+        )
@@ -0,0 +1,217 @@
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from attendance.benchmarking import LiveServerClient, TestClientTransport, percentile, seed
+from attendance.models import Attendance, QRToken
+from attendance.rollups import rebuild_daily_summaries
+
+
+class QueryCounter:
+    """Execute wrapper counting queries on the current thread's connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # endpoint -> [(seconds, queries)]
+        self.statuses = defaultdict(Counter)
+
+    def add(self, endpoint, seconds, queries, status_code):
+        with self._lock:
+            self.samples[endpoint].append((seconds, queries))
+            self.statuses[endpoint][status_code] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a lecture hall scanning within one window while teachers and students '
+        'read stats, the dashboard and exports; reports latency percentiles, throughput '
+        'and queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=32, help='Concurrent scanning threads')
+        parser.add_argument('--window', type=float, default=0,
+                            help='Spread scan start times over this many seconds (0 = as fast as possible)')
+        parser.add_argument('--stats-readers', type=int, default=4)
+        parser.add_argument('--dashboard-readers', type=int, default=2)
+        parser.add_argument('--export-readers', type=int, default=1)
+        parser.add_argument('--history-days', type=int, default=30,
+                            help='Days of past attendance to seed so reads have data')
+        parser.add_argument('--url', help='Base URL of a running server; default is the in-process test client')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        data = seed(options['students'])
+        class_obj = data.classes[0]
+        try:
+            self._seed_history(data, options['history_days'])
+            qr_token = QRToken.objects.create(class_obj=class_obj, created_by=data.teacher)
+
+            if options['url']:
+                def transport(user):
+                    return LiveServerClient(options['url'], user)
+            else:
+                transport = TestClientTransport
+            count_queries = not options['url']
+            recorder = Recorder()
+
+            started = time.perf_counter()
+            jobs = queue.Queue()
+            offsets = sorted(rng.uniform(0, options['window']) for _ in data.students)
+            order = list(data.students)
+            rng.shuffle(order)
+            for offset, student in zip(offsets, order):
+                jobs.put((started + offset, student))
+
+            burst_done = threading.Event()
+            scanners = [
+                threading.Thread(target=self._scanner, args=(jobs, transport, qr_token, recorder, count_queries))
+                for _ in range(options['workers'])
+            ]
+            readers = []
+            for endpoint, count in (
+                ('stats', options['stats_readers']),
+                ('dashboard', options['dashboard_readers']),
+                ('export', options['export_readers']),
+            ):
+                for i in range(count):
+                    user = data.students[i % len(data.students)] if endpoint == 'stats' else data.teacher
+                    readers.append(threading.Thread(
+                        target=self._reader,
+                        args=(endpoint, transport(user), class_obj.id, burst_done, recorder, count_queries),
+                    ))
+
+            for thread in scanners + readers:
+                thread.start()
+            for thread in scanners:
+                thread.join()
+            burst_seconds = time.perf_counter() - started
+            burst_done.set()
+            for thread in readers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            marked = Attendance.objects.filter(class_obj=class_obj, attendance_date=date.today()).count()
+            results = self._report(recorder, burst_seconds, elapsed, count_queries)
+            self.stdout.write(f'attendance rows marked today: {marked} of {len(data.students)} students')
+            if options['json_path']:
+                with open(options['json_path'], 'w') as fh:
+                    json.dump({
+                        'options': {key: options[key] for key in (
+                            'students', 'workers', 'window', 'stats_readers',
+                            'dashboard_readers', 'export_readers', 'history_days', 'url',
+                        )},
+                        'database': connection.vendor,
+                        'marked': marked,
+                        'burst_seconds': burst_seconds,
+                        'endpoints': results,
+                    }, fh, indent=2)
+        finally:
+            if not options['keep']:
+                data.cleanup()
+
+    def _seed_history(self, data, days):
+        if days <= 0:
+            return
+        statuses = ('present', 'present', 'present', 'late', 'absent')
+        Attendance.objects.bulk_create([
+            Attendance(
+                student=student,
+                class_obj=class_obj,
+                attendance_date=date.today() - timedelta(days=day),
+                status=statuses[(day + i) % len(statuses)],
+            )
+            for class_obj in data.classes
+            for day in range(1, days + 1)
+            for i, student in enumerate(data.students)
+        ], batch_size=5000)
+        rebuild_daily_summaries([c.id for c in data.classes])
+
+    def _timed(self, recorder, endpoint, client, method, path, payload, count_queries):
+        counter = QueryCounter()
+        begin = time.perf_counter()
+        if count_queries:
+            with connection.execute_wrapper(counter):
+                status_code = client.request(method, path, payload)
+        else:
+            status_code = client.request(method, path, payload)
+        recorder.add(endpoint, time.perf_counter() - begin, counter.count, status_code)
+
+    def _scanner(self, jobs, transport, qr_token, recorder, count_queries):
+        try:
+            while True:
+                try:
+                    not_before, student = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                delay = not_before - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                payload = {'token': str(qr_token.token), 'device_id': f'bench-device-{student.id}'}
+                self._timed(recorder, 'scan', transport(student), 'POST', '/api/attendance/scan/', payload, count_queries)
+        finally:
+            connections.close_all()
+
+    def _reader(self, endpoint, client, class_id, burst_done, recorder, count_queries):
+        path = {
+            'stats': '/api/attendance/stats/',
+            'dashboard': '/api/attendance/dashboard/',
+            'export': f'/api/attendance/export/?class_id={class_id}',
+        }[endpoint]
+        try:
+            while not burst_done.is_set():
+                self._timed(recorder, endpoint, client, 'GET', path, None, count_queries)
+        finally:
+            connections.close_all()
+
+    def _report(self, recorder, burst_seconds, elapsed, count_queries):
+        self.stdout.write(f'scan burst finished in {burst_seconds:.2f}s ({elapsed:.2f}s including readers)')
+        self.stdout.write(
+            f'{"endpoint":10} {"requests":>8} {"req/s":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} '
+            f'{"max ms":>9} {"queries":>8}  statuses'
+        )
+        results = {}
+        for endpoint in ('scan', 'stats', 'dashboard', 'export'):
+            samples = recorder.samples.get(endpoint)
+            if not samples:
+                continue
+            latencies = sorted(seconds * 1000 for seconds, _ in samples)
+            window = burst_seconds if endpoint == 'scan' else elapsed
+            queries = sum(q for _, q in samples) / len(samples) if count_queries else None
+            results[endpoint] = {
+                'requests': len(samples),
+                'throughput': len(samples) / window,
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'max_ms': latencies[-1],
+                'queries_per_request': queries,
+                'statuses': dict(sorted(recorder.statuses[endpoint].items())),
+            }
+            row = results[endpoint]
+            self.stdout.write(
+                f'{endpoint:10} {row["requests"]:8} {row["throughput"]:8.1f} {row["p50_ms"]:9.1f} '
+                f'{row["p95_ms"]:9.1f} {row["p99_ms"]:9.1f} {row["max_ms"]:9.1f} '
+                f'{"-" if queries is None else f"{queries:.1f}":>8}  {row["statuses"]}'
+            )
+        return results
@@ -0,0 +1,83 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.core.management.base import BaseCommand
+
+from attendance.benchmarking import api_client, seed
+from attendance.models import Attendance
+from attendance.rollups import rebuild_daily_summaries
+from classes.models import Enrollment
+
+
+def legacy_stats(student_id):
+    """The per-enrollment COUNT loop AttendanceStatsView used to run, for comparison."""
+    stats = []
+    for enrollment in Enrollment.objects.filter(student_id=student_id).select_related('class_obj'):
+        class_obj = enrollment.class_obj
+        records = Attendance.objects.filter(student_id=student_id, class_obj=class_obj)
+        records.count()
+        present = records.filter(status='present').count()
+        records.filter(status='absent').count()
+        late = records.filter(status='late').count()
+        total = Attendance.objects.filter(class_obj=class_obj).values('attendance_date').distinct().count()
+        stats.append((present + late) / total * 100 if total else 0)
+    return stats
+
+
+class Command(BaseCommand):
+    help = 'Benchmark AttendanceStatsView for one student against the legacy per-class COUNT loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=10)
+        parser.add_argument('--sessions', type=int, default=200)
+        parser.add_argument('--classmates', type=int, default=30,
+                            help='Other students per class, so class-wide counts have rows to scan')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    # Measure the query, not response cache hits after the warm-up call
+    @override_settings(RESPONSE_CACHE_SECONDS=0)
+    def handle(self, *args, **options):
+        data = seed(options['classmates'] + 1, num_classes=options['classes'])
+        try:
+            start = date.today() - timedelta(days=options['sessions'])
+            statuses = ('present', 'present', 'present', 'late', 'absent')
+            rows = [
+                Attendance(
+                    student=student,
+                    class_obj=class_obj,
+                    attendance_date=start + timedelta(days=day),
+                    status=statuses[(day + i) % len(statuses)],
+                )
+                for class_obj in data.classes
+                for day in range(options['sessions'])
+                for i, student in enumerate(data.students)
+            ]
+            Attendance.objects.bulk_create(rows, batch_size=5000)
+            rebuild_daily_summaries([c.id for c in data.classes])
+            self.stdout.write(f'seeded {len(rows)} attendance rows')
+
+            student = data.students[0]
+            client = api_client(student)
+
+            self._report('legacy loop', lambda: legacy_stats(student.id), options['runs'])
+            self._report('AttendanceStatsView', lambda: client.get('/api/attendance/stats/'), options['runs'])
+        finally:
+            if not options['keep']:
+                data.cleanup()
+
+    def _report(self, label, func, runs):
+        func()  # warm up
+        timings = []
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{label:22} queries={len(queries):4}  '
+            f'median={statistics.median(timings):8.2f}ms  max={max(timings):8.2f}ms'
+        )
@@ -0,0 +1,72 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from attendance.benchmarking import TestClientTransport, seed
+from config.db_router import REPLICA_DB_ALIAS
+
+ENDPOINTS = [
+    # (label, method, path, who is asking, alias that must see no queries)
+    ('generate QR', 'POST', '/api/attendance/qr/generate/', 'teacher', REPLICA_DB_ALIAS),
+    ('scan', 'POST', '/api/attendance/scan/', 'student', REPLICA_DB_ALIAS),
+    ('stats', 'GET', '/api/attendance/stats/', 'student', DEFAULT_DB_ALIAS),
+    ('dashboard', 'GET', '/api/attendance/dashboard/', 'teacher', DEFAULT_DB_ALIAS),
+    ('attendance list', 'GET', '/api/attendance/list/', 'teacher', DEFAULT_DB_ALIAS),
+    ('export', 'GET', '/api/attendance/export/', 'teacher', DEFAULT_DB_ALIAS),
+]
+
+
+class AliasCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Fail unless report endpoints read only from the replica alias and the scan path '
+        'never touches it. Needs DB_REPLICA_HOST; locally, point the replica at the '
+        'primary\'s database.'
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA_DB_ALIAS not in connections.databases:
+            raise CommandError('No replica database configured; set DB_REPLICA_HOST (and DB_REPLICA_NAME).')
+
+        data = seed(3)
+        student, class_obj = data.students[0], data.classes[0]
+        try:
+            failures = []
+            qr_token = None
+            for label, method, path, role, forbidden in ENDPOINTS:
+                user = data.teacher if role == 'teacher' else student
+                payload = None
+                if label == 'generate QR':
+                    payload = {'class_id': class_obj.id}
+                elif label == 'scan':
+                    qr_token = class_obj.qr_tokens.latest('created_at')
+                    payload = {'token': str(qr_token.token), 'device_id': 'routing-check'}
+
+                counters = {alias: AliasCounter() for alias in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)}
+                with ExitStack() as stack:
+                    for alias, counter in counters.items():
+                        stack.enter_context(connections[alias].execute_wrapper(counter))
+                    status_code = TestClientTransport(user).request(method, path, payload)
+
+                ok = status_code < 400 and counters[forbidden].count == 0
+                self.stdout.write(
+                    f'{"ok  " if ok else "FAIL"} {label:16} {method:4} status {status_code}  '
+                    f'default: {counters[DEFAULT_DB_ALIAS].count:3} queries  '
+                    f'replica: {counters[REPLICA_DB_ALIAS].count:3} queries'
+                )
+                if not ok:
+                    failures.append(label)
+            if failures:
+                raise CommandError(f'Routing check failed for: {", ".join(failures)}')
+            self.stdout.write(self.style.SUCCESS('Reports read from the replica; scans stay on the primary.'))
+        finally:
+            data.cleanup()
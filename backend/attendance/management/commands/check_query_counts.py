@@ -0,0 +1,96 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.settings import api_settings
+
+from attendance.benchmarking import api_client, seed
+from attendance.models import Attendance
+from classes.models import Enrollment
+from config.response_cache import invalidate
+
+User = get_user_model()
+
+LIST_ENDPOINTS = [
+    # (label, path, params, who is asking)
+    ('classes (admin)', '/api/classes/', {}, 'admin'),
+    ('classes (teacher)', '/api/classes/', {}, 'teacher'),
+    ('classes (student)', '/api/classes/', {}, 'student'),
+    ('enrollments', '/api/classes/enrollments/', {}, 'teacher'),
+    ('attendance list', '/api/attendance/list/', {}, 'teacher'),
+    ('attendance list (cursor)', '/api/attendance/list/', {'pagination': 'cursor'}, 'teacher'),
+    ('users', '/api/auth/users/', {'role': 'student'}, 'admin'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fail if any list endpoint issues more queries for a full page than for a '
+        'near-empty one, i.e. if a serializer or view has an N+1 query.'
+    )
+
+    # The warm-up request would otherwise fill the response cache and the
+    # measured one would be a hit that runs no queries
+    @override_settings(RESPONSE_CACHE_SECONDS=0)
+    def handle(self, *args, **options):
+        page_size = api_settings.PAGE_SIZE
+        data = seed(page_size + 5, num_classes=page_size + 5, enroll=False)
+        admin = User.objects.create_user(
+            email=f'{data.prefix}admin@example.invalid', name='Bench Admin', role='admin',
+        )
+        first_student = data.students[0]
+        try:
+            # Small dataset: one class and one student on every page
+            self.populate(data, data.classes[:1], data.students[:1])
+            small = self.measure(data, admin, first_student)
+
+            # Full pages: every class has every student
+            self.populate(data, data.classes[1:], data.students)
+            self.populate(data, data.classes[:1], data.students[1:])
+            full = self.measure(data, admin, first_student)
+
+            failures = []
+            for label, _, _, _ in LIST_ENDPOINTS:
+                grew = full[label] > small[label]
+                self.stdout.write(
+                    f'{"FAIL" if grew else "ok  "} {label:26} queries: {small[label]} -> {full[label]}'
+                )
+                if grew:
+                    failures.append(label)
+            if failures:
+                raise CommandError(f'Query count grows with page size: {", ".join(failures)}')
+            self.stdout.write(self.style.SUCCESS('List endpoint query counts are independent of page size.'))
+        finally:
+            data.cleanup()
+
+    @staticmethod
+    def populate(data, classes, students):
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=s, class_obj=c) for c in classes for s in students],
+            ignore_conflicts=True,
+        )
+        Attendance.objects.bulk_create(
+            [
+                Attendance(student=s, class_obj=c, attendance_date=date.today(), status='present')
+                for c in classes for s in students
+            ],
+            ignore_conflicts=True,
+        )
+        # bulk_create skips the signals that invalidate cached responses
+        invalidate(classes=[c.id for c in classes], students=[s.id for s in students])
+
+    @staticmethod
+    def measure(data, admin, student):
+        users = {'admin': admin, 'teacher': data.teacher, 'student': student}
+        counts = {}
+        for label, path, params, who in LIST_ENDPOINTS:
+            client = api_client(users[who])
+            client.get(path, params)  # warm caches (e.g. content types)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path, params)
+            if response.status_code != 200:
+                raise CommandError(f'{label}: HTTP {response.status_code}')
+            counts[label] = len(queries)
+        return counts
@@ -0,0 +1,116 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, FilteredRelation, Q
+from django.utils import timezone
+
+from attendance.benchmarking import seed
+from attendance.models import Attendance, QRToken
+from classes.models import Enrollment
+
+
+def uses_index(plan):
+    """True when every scan of a seeded table in the plan goes through an index."""
+    if connection.vendor == 'postgresql':
+        return not re.search(r'Seq Scan on (attendance|qr_tokens|enrollments)\b', plan)
+    if connection.vendor == 'sqlite':
+        # "SCAN <table>" without "USING ... INDEX" is a full table scan
+        return not re.search(r'SCAN (attendance|qr_tokens|enrollments)\b(?!.*USING)', plan)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a dataset and assert that the hot attendance, enrollment and QR token '
+        'queries are planned as index scans. Exits non-zero on a regression.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--classes', type=int, default=8)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        data = seed(options['students'], num_classes=options['classes'])
+        try:
+            start = date.today() - timedelta(days=options['days'])
+            for class_obj in data.classes:
+                Attendance.objects.bulk_create(
+                    [
+                        Attendance(
+                            student=student,
+                            class_obj=class_obj,
+                            attendance_date=start + timedelta(days=day),
+                            status='late' if (i + day) % 7 == 0 else 'present',
+                            device_id=f'device-{student.id}',
+                        )
+                        for day in range(options['days'])
+                        for i, student in enumerate(data.students)
+                    ],
+                    batch_size=5000,
+                )
+                QRToken.objects.bulk_create([
+                    QRToken(
+                        class_obj=class_obj,
+                        created_by=data.teacher,
+                        expires_at=timezone.now() - timedelta(days=day),
+                    )
+                    for day in range(options['days'])
+                ])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            self.check_plans(data, options['verbose_plans'])
+        finally:
+            if not options['keep']:
+                data.cleanup()
+
+    def hot_queries(self, data):
+        student = data.students[0]
+        class_obj = data.classes[0]
+        today = date.today() - timedelta(days=1)
+        return {
+            'scan device conflict': Attendance.objects.filter(
+                class_obj=class_obj, attendance_date=today, device_id='device-1',
+            ),
+            'scan duplicate conflict': Attendance.objects.filter(
+                student=student, class_obj=class_obj, attendance_date=today,
+            ),
+            'student stats': (
+                Enrollment.objects.filter(student=student)
+                .annotate(own=FilteredRelation(
+                    'class_obj__attendances',
+                    condition=Q(class_obj__attendances__student=student),
+                ))
+                .values('class_obj_id')
+                .annotate(present=Count('own', filter=Q(own__status='present')))
+            ),
+            'class day by status': Attendance.objects.filter(
+                class_obj=class_obj, attendance_date=today, status='present',
+            ).values_list('student_id', flat=True),
+            'active QR token': QRToken.objects.filter(
+                class_obj=class_obj, expires_at__gt=timezone.now(),
+            ).order_by('-created_at')[:1],
+            'class roster': Enrollment.objects.filter(class_obj=class_obj).values_list('student_id', flat=True),
+            'keyset page': Attendance.objects.filter(attendance_date__lte=today).order_by(
+                '-attendance_date', '-marked_at', '-id',
+            )[:21],
+        }
+
+    def check_plans(self, data, verbose):
+        failures = []
+        for name, queryset in self.hot_queries(data).items():
+            plan = queryset.explain()
+            ok = uses_index(plan)
+            if verbose or not ok:
+                self.stdout.write(f'--- {name}\n{plan}')
+            self.stdout.write(f'{"ok  " if ok else "FAIL"} {name}')
+            if not ok:
+                failures.append(name)
+        if failures:
+            raise CommandError(f'Queries not using an index: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use index scans.'))
@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from attendance.absences import close_finished_sessions
+
+
+class Command(BaseCommand):
+    help = 'Mark enrolled students who never scanned absent in every finished, unclosed session.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Close the sessions of this day (YYYY-MM-DD) instead of the recent ones')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, with this many seconds between passes')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+
+        while True:
+            close_old_connections()
+            sessions, absent = close_finished_sessions(day=day)
+            self.stdout.write(f'Closed {sessions} sessions, marked {absent} students absent')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
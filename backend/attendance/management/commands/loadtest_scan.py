@@ -0,0 +1,76 @@
+import threading
+from collections import Counter
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from attendance.benchmarking import api_client, run_threads, seed
+from attendance.models import Attendance, QRToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer /api/attendance/scan/ from concurrent threads against the configured '
+        'database and check that duplicate and shared-device scans never produce a '
+        '500 or a second attendance row.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--repeats', type=int, default=3, help='Concurrent scans fired per student')
+        parser.add_argument('--shared-devices', type=int, default=5,
+                            help='Number of devices each shared by a pair of students')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        data = seed(options['students'])
+        class_obj = data.classes[0]
+        try:
+            qr_token = QRToken.objects.create(class_obj=class_obj, created_by=data.teacher)
+            clients = {student.id: api_client(student) for student in data.students}
+
+            # Students 2k and 2k+1 share a device for the first --shared-devices pairs
+            devices = {}
+            for i, student in enumerate(data.students):
+                pair = i // 2
+                devices[student.id] = f'shared-{pair}' if pair < options['shared_devices'] else f'device-{i}'
+
+            statuses = Counter()
+            lock = threading.Lock()
+
+            def scan(student_id):
+                response = clients[student_id].post(
+                    '/api/attendance/scan/',
+                    {'token': str(qr_token.token), 'device_id': devices[student_id]},
+                    content_type='application/json',
+                )
+                with lock:
+                    statuses[response.status_code] += 1
+
+            jobs = [(s.id,) for s in data.students for _ in range(options['repeats'])]
+            run_threads(scan, jobs)
+
+            rows = Attendance.objects.filter(class_obj=class_obj, attendance_date=date.today())
+            per_student = rows.values('student').annotate(n=Count('id')).filter(n__gt=1).count()
+            per_device = rows.exclude(device_id='').values('device_id').annotate(n=Count('id')).filter(n__gt=1).count()
+            expected = options['students'] - min(options['shared_devices'], options['students'] // 2)
+
+            self.stdout.write(f'requests: {len(jobs)}  responses: {dict(sorted(statuses.items()))}')
+            self.stdout.write(f'attendance rows: {rows.count()} (expected {expected})')
+
+            problems = []
+            if statuses[500]:
+                problems.append(f'{statuses[500]} requests failed with 500')
+            if per_student:
+                problems.append(f'{per_student} students have more than one row')
+            if per_device:
+                problems.append(f'{per_device} devices marked more than one student')
+            if rows.count() != expected:
+                problems.append('unexpected number of attendance rows')
+            if problems:
+                raise CommandError('; '.join(problems))
+            self.stdout.write(self.style.SUCCESS('Scan endpoint stayed consistent under concurrency.'))
+        finally:
+            if not options['keep']:
+                data.cleanup()
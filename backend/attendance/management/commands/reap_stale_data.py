@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.reaper import archive_attendance, open_archive_file, reap_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired QR tokens and archive attendance older than the retention window.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.ATTENDANCE_RETENTION_DAYS,
+                            help='Archive attendance older than this many days (0 disables archiving)')
+        parser.add_argument('--batch-size', type=int, default=settings.REAPER_BATCH_SIZE)
+        parser.add_argument('--archive-file',
+                            help='Also append archived rows to this NDJSON file (gzipped if it ends in .gz)')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, with this many seconds between passes')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            tokens = reap_expired_tokens(batch_size=options['batch_size'])
+            archive_file = open_archive_file(options['archive_file']) if options['archive_file'] else None
+            try:
+                archived = archive_attendance(
+                    retention_days=options['retention_days'],
+                    batch_size=options['batch_size'],
+                    archive_file=archive_file,
+                )
+            finally:
+                if archive_file is not None:
+                    archive_file.close()
+            self.stdout.write(f'Deleted {tokens} expired QR tokens, archived {archived} attendance rows')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.rollups import rebuild_daily_summaries, verify_daily_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily attendance rollup from raw attendance rows, or verify it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, action='append', dest='class_ids',
+                            help='Limit to this class (repeatable)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare the rollup with raw attendance; exit non-zero on mismatch')
+
+    def handle(self, *args, **options):
+        class_ids = options['class_ids']
+
+        if options['verify']:
+            mismatches = verify_daily_summaries(class_ids)
+            for class_id, day, stored, expected in mismatches:
+                self.stdout.write(
+                    f'class {class_id} {day}: stored (present, late, absent)={stored} expected={expected}'
+                )
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} summary rows are out of date')
+            self.stdout.write(self.style.SUCCESS('Attendance rollup matches raw attendance.'))
+            return
+
+        count = rebuild_daily_summaries(class_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily summary rows.'))
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.realtime import InProcessBroker, get_broker
+from attendance.rotation import rotate_due_tokens
+
+
+class Command(BaseCommand):
+    help = 'Run the QR token rotation scheduler in the foreground.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.QR_ROTATION_INTERVAL_SECONDS,
+                            help='Seconds between rotation passes')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+
+    def handle(self, *args, **options):
+        if isinstance(get_broker(), InProcessBroker):
+            self.stderr.write(self.style.WARNING(
+                'ATTENDANCE_BROKER is the in-process broker: qr_rotated events will not reach '
+                'stream clients of web processes. Configure a cross-process broker or set '
+                'QR_ROTATION_IN_PROCESS.'
+            ))
+        while True:
+            close_old_connections()
+            rotated = rotate_due_tokens()
+            if rotated:
+                self.stdout.write(f'Rotated {len(rotated)} QR tokens')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
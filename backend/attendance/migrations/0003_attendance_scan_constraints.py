@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:02
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+# Duplicate groups listed in the error before it is truncated
+MAX_REPORTED = 20
+
+
+def check_device_duplicates(apps, schema_editor):
+    """
+    Refuse to add the device constraint over rows that already violate it.
+
+    The old application-level device check was racy, so a database can hold
+    two students' attendance from one device on the same day. Those rows are
+    proxy-attendance evidence, not noise, so they are reported for a person
+    to resolve (delete the proxy rows, or blank their device_id) rather than
+    dropped here.
+    """
+    Attendance = apps.get_model('attendance', 'Attendance')
+    duplicates = list(
+        Attendance.objects.using(schema_editor.connection.alias)
+        .exclude(Q(device_id__isnull=True) | Q(device_id=''))
+        .values('class_obj_id', 'attendance_date', 'device_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+        .order_by('class_obj_id', 'attendance_date', 'device_id')
+    )
+    if not duplicates:
+        return
+    groups = '\n'.join(
+        f"  class {row['class_obj_id']}, {row['attendance_date']}, device {row['device_id']!r}: {row['rows']} rows"
+        for row in duplicates[:MAX_REPORTED]
+    )
+    more = f'\n  ... and {len(duplicates) - MAX_REPORTED} more' if len(duplicates) > MAX_REPORTED else ''
+    raise RuntimeError(
+        f'Cannot add uniq_attendance_class_date_device: {len(duplicates)} (class, date, device) '
+        f'groups already have attendance for more than one student:\n{groups}{more}\n'
+        'Delete the proxy rows or set their device_id to an empty string, then migrate again.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_qrtoken_latitude_qrtoken_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='attendance',
+            unique_together=set(),
+        ),
+        migrations.RunPython(check_device_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'class_obj', 'attendance_date'), name='uniq_attendance_student_class_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('device_id__isnull', False), models.Q(('device_id', ''), _negated=True)), fields=('class_obj', 'attendance_date', 'device_id'), name='uniq_attendance_class_date_device'),
+        ),
+    ]
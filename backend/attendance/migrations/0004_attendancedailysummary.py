@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:05
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def backfill_summaries(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceDailySummary = apps.get_model('attendance', 'AttendanceDailySummary')
+    Enrollment = apps.get_model('classes', 'Enrollment')
+
+    enrolled = dict(
+        Enrollment.objects.order_by().values('class_obj_id')
+        .annotate(n=Count('id')).values_list('class_obj_id', 'n')
+    )
+    rows = Attendance.objects.order_by().values('class_obj_id', 'attendance_date').annotate(
+        present=Count('id', filter=Q(status='present')),
+        late=Count('id', filter=Q(status='late')),
+        absent=Count('id', filter=Q(status='absent')),
+    )
+    AttendanceDailySummary.objects.bulk_create(
+        (
+            AttendanceDailySummary(
+                class_obj_id=row['class_obj_id'],
+                date=row['attendance_date'],
+                present_count=row['present'],
+                late_count=row['late'],
+                absent_count=row['absent'],
+                enrolled_count=enrolled.get(row['class_obj_id'], 0),
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0002_class_session_count'),
+        ('attendance', '0003_attendance_scan_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('enrolled_count', models.PositiveIntegerField(default=0)),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='classes.class')),
+            ],
+            options={
+                'db_table': 'attendance_daily_summary',
+                'indexes': [models.Index(fields=['date'], name='idx_summary_date')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancedailysummary',
+            constraint=models.UniqueConstraint(fields=('class_obj', 'date'), name='uniq_summary_class_date'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
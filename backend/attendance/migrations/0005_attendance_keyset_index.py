@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendancedailysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['attendance_date', 'marked_at', 'id'], name='idx_attendance_keyset'),
+        ),
+    ]
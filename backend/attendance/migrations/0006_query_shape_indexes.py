@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendance_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='idx_attendance_student',
+        ),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='idx_attendance_class',
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'class_obj', 'status'], name='idx_attendance_student_status'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['class_obj', 'attendance_date', 'status'], include=('student',), name='idx_attendance_class_day'),
+        ),
+        migrations.AddIndex(
+            model_name='qrtoken',
+            index=models.Index(fields=['class_obj', 'expires_at', 'created_at'], name='idx_qrtoken_class_active'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrtoken',
+            name='rotate_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='qrtoken',
+            name='session_started_at',
+            field=models.DateTimeField(blank=True, help_text='When the rotating session began; lateness is measured from here', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='qrtoken',
+            index=models.Index(condition=models.Q(('rotate_until__isnull', False)), fields=['rotate_until'], name='idx_qrtoken_rotating'),
+        ),
+    ]
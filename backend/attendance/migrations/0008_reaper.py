@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_query_shape_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0007_qrtoken_rotation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+            ],
+            options={
+                'db_table': 'attendance_archive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='qrtoken',
+            index=models.Index(fields=['expires_at'], name='idx_qrtoken_expires'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='class_obj',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to='classes.class'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancearchive',
+            constraint=models.UniqueConstraint(fields=('student', 'class_obj'), name='uniq_archive_student_class'),
+        ),
+    ]
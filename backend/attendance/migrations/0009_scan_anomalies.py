@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_query_shape_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0008_reaper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'attendance_analysis_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('device', 'Device'), ('ip', 'IP address')], max_length=10)),
+                ('value', models.CharField(max_length=255)),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_links', to='classes.class')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendance_scan_links',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shared_device', 'Device used by several students'), ('shared_ip', 'Many students from one IP address'), ('location_cluster', 'Several students scanned from one spot at once')], max_length=20)),
+                ('value', models.CharField(help_text='Device id, IP address or cluster location', max_length=255)),
+                ('student_ids', models.JSONField(default=list)),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('occurrences', models.PositiveIntegerField(default=0, help_text='Days on which the pattern was seen')),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_anomalies', to='classes.class')),
+            ],
+            options={
+                'db_table': 'attendance_scan_anomalies',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scanlink',
+            constraint=models.UniqueConstraint(fields=('class_obj', 'kind', 'value', 'date', 'student'), name='uniq_scanlink'),
+        ),
+        migrations.AddIndex(
+            model_name='scananomaly',
+            index=models.Index(fields=['last_date'], name='idx_anomaly_last_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='scananomaly',
+            constraint=models.UniqueConstraint(fields=('class_obj', 'kind', 'value'), name='uniq_anomaly_class_kind_value'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_scan_anomalies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancedailysummary',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
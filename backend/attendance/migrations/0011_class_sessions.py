@@ -0,0 +1,113 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:33
+
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_sessions(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceDailySummary = apps.get_model('attendance', 'AttendanceDailySummary')
+    ClassSession = apps.get_model('attendance', 'ClassSession')
+    QRToken = apps.get_model('attendance', 'QRToken')
+    Class = apps.get_model('classes', 'Class')
+
+    # One session per class-day with attendance or a summary row (archived days)
+    started = {
+        (class_id, day): first for class_id, day, first in
+        Attendance.objects.order_by().values('class_obj_id', 'attendance_date')
+        .annotate(first=Min('marked_at')).values_list('class_obj_id', 'attendance_date', 'first')
+    }
+    closed = {
+        (class_id, day): closed_at for class_id, day, closed_at in
+        AttendanceDailySummary.objects.values_list('class_obj_id', 'date', 'closed_at')
+    }
+    ClassSession.objects.bulk_create(
+        (
+            ClassSession(
+                class_obj_id=class_id,
+                date=day,
+                started_at=started.get((class_id, day)) or timezone.make_aware(datetime.combine(day, time.min)),
+                ended_at=closed.get((class_id, day)),
+            )
+            for class_id, day in set(started) | set(closed)
+        ),
+        batch_size=1000,
+    )
+
+    Attendance.objects.update(session_id=Subquery(
+        ClassSession.objects.filter(
+            class_obj_id=OuterRef('class_obj_id'), date=OuterRef('attendance_date'),
+        ).values('id')[:1]
+    ))
+    # Tokens are few (the reaper bounds them), so link them in Python
+    sessions = {
+        (class_id, day): session_id
+        for session_id, class_id, day in ClassSession.objects.values_list('id', 'class_obj_id', 'date')
+    }
+    tokens = defaultdict(list)
+    for token_id, class_id, created_at in QRToken.objects.values_list('id', 'class_obj_id', 'created_at'):
+        key = (class_id, timezone.localdate(created_at))
+        if key in sessions:
+            tokens[sessions[key]].append(token_id)
+    for session_id, token_ids in tokens.items():
+        QRToken.objects.filter(pk__in=token_ids).update(session_id=session_id)
+    for class_id, count, last in (
+        ClassSession.objects.order_by().values('class_obj_id')
+        .annotate(n=Count('id'), last=Max('date')).values_list('class_obj_id', 'n', 'last')
+    ):
+        Class.objects.filter(pk=class_id).update(session_count=count, last_session_date=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_query_shape_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0010_session_close'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='classes.class')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'class_sessions',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendances', to='attendance.classsession'),
+        ),
+        migrations.AddField(
+            model_name='qrtoken',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='qr_tokens', to='attendance.classsession'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(condition=models.Q(('ended_at__isnull', True)), fields=['date'], name='idx_session_open'),
+        ),
+        migrations.AddConstraint(
+            model_name='classsession',
+            constraint=models.UniqueConstraint(fields=('class_obj', 'date'), name='uniq_session_class_date'),
+        ),
+        migrations.RunPython(backfill_sessions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='attendancedailysummary',
+            name='closed_at',
+        ),
+    ]
@@ -4,6 +4,42 @@ from django.conf import settings
 from django.utils import timezone
 
 
+class ClassSession(models.Model):
+    """
+    One meeting of a class on a day. The day's QR codes and attendance rows
+    point at it, and creating it advances the class's session count.
+    """
+    class_obj = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='sessions'
+    )
+    date = models.DateField()
+    started_at = models.DateTimeField()
+    # Set once the session is over and enrolled students who never scanned
+    # have been marked absent
+    ended_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='+'
+    )
+
+    class Meta:
+        db_table = 'class_sessions'
+        constraints = [
+            models.UniqueConstraint(fields=['class_obj', 'date'], name='uniq_session_class_date'),
+        ]
+        indexes = [
+            # Absent marking: sessions not closed yet
+            models.Index(fields=['date'], condition=models.Q(ended_at__isnull=True), name='idx_session_open'),
+        ]
+
+    def __str__(self):
+        return f"{self.class_obj.subject_name} - {self.date}"
+
+
 class QRToken(models.Model):
     """Dynamic QR token that expires after configured seconds."""
     class_obj = models.ForeignKey(
@@ -24,8 +60,33 @@ class QRToken(models.Model):
     longitude = models.FloatField(blank=True, null=True)
     radius_meters = models.IntegerField(default=100, help_text="Allowed radius in meters from QR location")
 
+    # Automatic rotation — the scheduler issues successors until rotate_until
+    rotate_until = models.DateTimeField(blank=True, null=True)
+    session_started_at = models.DateTimeField(
+        blank=True, null=True,
+        help_text="When the rotating session began; lateness is measured from here"
+    )
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='qr_tokens'
+    )
+
     class Meta:
         db_table = 'qr_tokens'
+        indexes = [
+            # ActiveQRView: latest unexpired token for a class
+            models.Index(fields=['class_obj', 'expires_at', 'created_at'], name='idx_qrtoken_class_active'),
+            # Reaper: expired tokens across all classes
+            models.Index(fields=['expires_at'], name='idx_qrtoken_expires'),
+            # Rotation scheduler: only tokens of auto-rotating sessions
+            models.Index(
+                fields=['rotate_until'],
+                condition=models.Q(rotate_until__isnull=False),
+                name='idx_qrtoken_rotating',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.expires_at:
@@ -49,17 +110,27 @@ class Attendance(models.Model):
         ('late', 'Late'),
     )
 
+    # Neither foreign key gets its own index: the unique constraint leads with
+    # student and idx_attendance_class_day with class_obj
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='attendances'
+        related_name='attendances',
+        db_index=False,
     )
     class_obj = models.ForeignKey(
         'classes.Class',
         on_delete=models.CASCADE,
-        related_name='attendances'
+        related_name='attendances',
+        db_index=False,
     )
     attendance_date = models.DateField()
+    session = models.ForeignKey(
+        ClassSession,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='attendances'
+    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     device_id = models.CharField(max_length=255, blank=True, null=True)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
@@ -69,12 +140,179 @@ class Attendance(models.Model):
 
     class Meta:
         db_table = 'attendance'
-        unique_together = ('student', 'class_obj', 'attendance_date')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'class_obj', 'attendance_date'],
+                name='uniq_attendance_student_class_date',
+            ),
+            # Anti-proxy: one device may mark only one student per class per day
+            models.UniqueConstraint(
+                fields=['class_obj', 'attendance_date', 'device_id'],
+                condition=models.Q(device_id__isnull=False) & ~models.Q(device_id=''),
+                name='uniq_attendance_class_date_device',
+            ),
+        ]
+        # Attendance takes every scan, so each index has to earn its write
+        # cost. The (class_obj, attendance_date, device_id) path is served by
+        # the partial unique constraint above, and date-only filters by the
+        # keyset index, which leads with attendance_date.
         indexes = [
-            models.Index(fields=['student'], name='idx_attendance_student'),
-            models.Index(fields=['class_obj'], name='idx_attendance_class'),
-            models.Index(fields=['attendance_date'], name='idx_attendance_date'),
+            # AttendanceStatsView: a student's rows in a class, counted by status
+            models.Index(fields=['student', 'class_obj', 'status'], name='idx_attendance_student_status'),
+            # Per-class day views (rollup rebuilds, exports, absent marking)
+            models.Index(
+                fields=['class_obj', 'attendance_date', 'status'],
+                include=['student'],
+                name='idx_attendance_class_day',
+            ),
+            # Keyset pagination order for AttendanceListView
+            models.Index(fields=['attendance_date', 'marked_at', 'id'], name='idx_attendance_keyset'),
         ]
 
     def __str__(self):
         return f"{self.student.name} - {self.class_obj.subject_name} - {self.attendance_date}"
+
+
+class AttendanceDailySummary(models.Model):
+    """Per-class, per-day attendance counts, maintained as attendance is written."""
+    class_obj = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='daily_summaries'
+    )
+    date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    enrolled_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'attendance_daily_summary'
+        constraints = [
+            models.UniqueConstraint(fields=['class_obj', 'date'], name='uniq_summary_class_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='idx_summary_date'),
+        ]
+
+    @property
+    def total_count(self):
+        return self.present_count + self.late_count + self.absent_count
+
+    def __str__(self):
+        return f"{self.class_obj.subject_name} - {self.date}"
+
+
+class AttendanceArchive(models.Model):
+    """
+    Per-student, per-class counts of attendance rows moved out of the hot
+    ``attendance`` table once they passed the retention window.
+    """
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_archives'
+    )
+    class_obj = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='attendance_archives'
+    )
+    present_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    first_date = models.DateField()
+    last_date = models.DateField()
+
+    class Meta:
+        db_table = 'attendance_archive'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'class_obj'], name='uniq_archive_student_class'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.class_obj_id} (through {self.last_date})"
+
+
+class ScanLink(models.Model):
+    """One student seen on one device or IP address in a class on a day."""
+    KIND_CHOICES = (
+        ('device', 'Device'),
+        ('ip', 'IP address'),
+    )
+
+    class_obj = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='scan_links'
+    )
+    date = models.DateField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255)
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='scan_links'
+    )
+
+    class Meta:
+        db_table = 'attendance_scan_links'
+        constraints = [
+            # Also serves the analyser's (class, kind, value, date range) reads
+            models.UniqueConstraint(
+                fields=['class_obj', 'kind', 'value', 'date', 'student'],
+                name='uniq_scanlink',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.value} - {self.student_id} ({self.date})"
+
+
+class ScanAnomaly(models.Model):
+    """A suspicious scan pattern flagged by the anomaly analyser."""
+    KIND_CHOICES = (
+        ('shared_device', 'Device used by several students'),
+        ('shared_ip', 'Many students from one IP address'),
+        ('location_cluster', 'Several students scanned from one spot at once'),
+    )
+
+    class_obj = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='scan_anomalies'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255, help_text="Device id, IP address or cluster location")
+    student_ids = models.JSONField(default=list)
+    student_count = models.PositiveIntegerField(default=0)
+    occurrences = models.PositiveIntegerField(default=0, help_text="Days on which the pattern was seen")
+    first_date = models.DateField()
+    last_date = models.DateField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_scan_anomalies'
+        constraints = [
+            models.UniqueConstraint(fields=['class_obj', 'kind', 'value'], name='uniq_anomaly_class_kind_value'),
+        ]
+        indexes = [
+            models.Index(fields=['last_date'], name='idx_anomaly_last_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.value}"
+
+
+class AnalysisCursor(models.Model):
+    """How far an incremental job has read through the attendance table."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_analysis_cursors'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class AttendanceKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (attendance_date, marked_at, id), newest first.
+
+    The cursor carries the last row's key, so every page is an index range
+    scan of ``page_size + 1`` rows: no COUNT(*) and no OFFSET, however deep
+    the page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        if reverse:
+            queryset = queryset.order_by('attendance_date', 'marked_at', 'id')
+        else:
+            queryset = queryset.order_by('-attendance_date', '-marked_at', '-id')
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forwards there is a previous page iff we came from a cursor;
+        # going backwards there is always a next page (the one we came from)
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    @staticmethod
+    def position_filter(position, reverse):
+        """Rows strictly after ``position`` in the requested direction."""
+        attendance_date, marked_at, pk = position
+        op = 'gt' if reverse else 'lt'
+        return (
+            # Redundant leading-column bound keeps this a single index range
+            Q(**{f'attendance_date__{op}e': attendance_date}) & (
+                Q(**{f'attendance_date__{op}': attendance_date})
+                | Q(attendance_date=attendance_date, **{f'marked_at__{op}': marked_at})
+                | Q(attendance_date=attendance_date, marked_at=marked_at, **{f'id__{op}': pk})
+            )
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = (
+                date.fromisoformat(payload['d']),
+                parse_datetime(payload['m']),
+                int(payload['i']),
+            )
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[1] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            'd': row.attendance_date.isoformat(),
+            'm': row.marked_at.isoformat(),
+            'i': row.id,
+        }
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
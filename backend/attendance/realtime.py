@@ -0,0 +1,107 @@
+"""
+Publish/subscribe broker for live attendance events.
+
+Views publish QR rotations and scans per class; the ASGI stream endpoints in
+``attendance.streams`` subscribe teacher dashboards to them. The default
+broker only connects publishers and subscribers in the same process. Set
+``ATTENDANCE_BROKER`` to the dotted path of another broker class (same
+``publish``/``subscribe`` interface) to fan events out across processes.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """An async iterator of events for one class, fed by the broker."""
+
+    def __init__(self, broker, class_id, maxsize):
+        self.broker = broker
+        self.class_id = class_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        """Queue an event from any thread; drops the oldest if the client is too slow."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+
+class InProcessBroker:
+    """Fan events out to subscribers living in this process."""
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, class_id):
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(self, class_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(class_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.class_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.class_id]
+
+    def publish(self, class_id, event):
+        """Send ``event`` (a JSON-serializable dict) to every subscriber of the class."""
+        subscribers = self._subscribers.get(class_id)
+        if not subscribers:
+            return
+        with self._lock:
+            subscribers = list(subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, class_id=None):
+        with self._lock:
+            if class_id is not None:
+                return len(self._subscribers.get(class_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'ATTENDANCE_BROKER', 'attendance.realtime.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish(class_id, event_type, **payload):
+    get_broker().publish(class_id, {'type': event_type, 'class_id': class_id, **payload})
@@ -0,0 +1,143 @@
+"""
+Stale data reaper.
+
+Expired QR tokens are otherwise only deleted when their class generates a
+new code, so idle classes leave dead rows behind. The reaper deletes them in
+bounded batches once they are past the offline replay window, and, when
+ATTENDANCE_RETENTION_DAYS is set, moves older attendance out of the hot
+``attendance`` table into per-student counters in ``attendance_archive``
+(optionally appending every column of the rows to an NDJSON file as each
+batch commits).
+"""
+import gzip
+import json
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from config.response_cache import invalidate
+from .models import Attendance, AttendanceArchive, QRToken
+from .rollups import STATUS_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def reap_expired_tokens(now=None, batch_size=None):
+    """Delete tokens that expired before the offline replay window; returns the number deleted."""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.REAPER_BATCH_SIZE
+    cutoff = now - timedelta(seconds=settings.OFFLINE_SCAN_MAX_AGE_SECONDS)
+
+    reclaimed = 0
+    while True:
+        ids = list(
+            QRToken.objects.filter(expires_at__lt=cutoff).order_by().values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted, _ = QRToken.objects.filter(pk__in=ids).delete()
+        reclaimed += deleted
+        if len(ids) < batch_size:
+            break
+    return reclaimed
+
+
+def open_archive_file(path):
+    """Open an NDJSON archive for appending, gzipped if the name ends in .gz."""
+    return gzip.open(path, 'ab') if path.endswith('.gz') else open(path, 'ab')
+
+
+def _add_to_archive(rows):
+    """Fold ``(id, student_id, class_id, date, status)`` rows into the archive counters."""
+    totals = {}
+    for _, student_id, class_id, attendance_date, status in rows:
+        counts, dates = totals.setdefault((student_id, class_id), (Counter(), []))
+        counts[STATUS_FIELDS[status]] += 1
+        dates.append(attendance_date)
+
+    # Make sure every pair has a row (a concurrent reaper may insert the same
+    # one; the conflict is ignored), then add to the counters in place
+    AttendanceArchive.objects.bulk_create(
+        [
+            AttendanceArchive(student_id=student_id, class_obj_id=class_id, first_date=min(dates), last_date=max(dates))
+            for (student_id, class_id), (_, dates) in totals.items()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for (student_id, class_id), (counts, dates) in totals.items():
+        AttendanceArchive.objects.filter(student_id=student_id, class_obj_id=class_id).update(
+            first_date=Least('first_date', Value(min(dates))),
+            last_date=Greatest('last_date', Value(max(dates))),
+            **{field: F(field) + n for field, n in counts.items()},
+        )
+
+
+def archive_rows(ids):
+    """Every column of the given attendance rows, for the NDJSON archive file."""
+    columns = [field.attname for field in Attendance._meta.concrete_fields]
+    return list(Attendance.objects.filter(pk__in=ids).order_by('id').values(*columns))
+
+
+def write_archive(archive_file, rows):
+    archive_file.write(''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows).encode('utf-8'))
+
+
+def archive_attendance(retention_days=None, today=None, batch_size=None, archive_file=None):
+    """
+    Move attendance older than the retention window into the archive.
+
+    Each batch is counted into the archive and deleted in one transaction;
+    rows locked by a concurrent reaper are skipped. ``archive_file`` is a
+    binary file object that receives the full rows as NDJSON. Returns the
+    number of rows archived.
+    """
+    if retention_days is None:
+        retention_days = settings.ATTENDANCE_RETENTION_DAYS
+    if retention_days <= 0:
+        return 0
+    batch_size = batch_size or settings.REAPER_BATCH_SIZE
+    cutoff = (today or timezone.localdate()) - timedelta(days=retention_days)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Attendance.objects.select_for_update(skip_locked=True)
+                .filter(attendance_date__lt=cutoff)
+                .order_by('attendance_date', 'id')
+                .values_list('id', 'student_id', 'class_obj_id', 'attendance_date', 'status')[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            _add_to_archive(rows)
+            if archive_file is not None:
+                # Written once the batch commits, so a rolled back pass that
+                # is retried doesn't write its rows twice
+                full_rows = archive_rows(ids)
+                transaction.on_commit(lambda full_rows=full_rows: write_archive(archive_file, full_rows))
+            Attendance.objects.filter(pk__in=ids).delete()
+            invalidate(classes={row[2] for row in rows}, students={row[1] for row in rows})
+        archived += len(rows)
+        if len(rows) < batch_size:
+            break
+    return archived
+
+
+def reap(archive_file=None):
+    """One reaper pass; returns the rows reclaimed per table."""
+    reclaimed = {
+        'qr_tokens': reap_expired_tokens(),
+        'attendance': archive_attendance(archive_file=archive_file),
+    }
+    if any(reclaimed.values()):
+        logger.info('Reaped %(qr_tokens)d QR tokens and archived %(attendance)d attendance rows', reclaimed)
+    return reclaimed
@@ -0,0 +1,184 @@
+"""
+Incrementally maintained attendance aggregates.
+
+Every attendance write (scans, session closes, admin edits and deletes) also
+bumps the matching AttendanceDailySummary row, so dashboards and stats read a
+handful of rollup rows instead of recounting the attendance table. A class's session count is the number of its ClassSession
+rows and is advanced when a session is opened (see ``attendance.sessions``).
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+
+from classes.models import Class, Enrollment
+from config.response_cache import invalidate_all
+from .models import Attendance, AttendanceArchive, AttendanceDailySummary, ClassSession
+from .sessions import ensure_sessions
+
+STATUS_FIELDS = {
+    'present': 'present_count',
+    'late': 'late_count',
+    'absent': 'absent_count',
+}
+
+
+def _bump(class_id, attendance_date, increments):
+    return AttendanceDailySummary.objects.filter(
+        class_obj_id=class_id, date=attendance_date,
+    ).update(**{field: F(field) + n for field, n in increments.items()})
+
+
+def record_attendance(class_id, attendance_date, statuses, enrolled_count=None):
+    """
+    Add attendance rows to the class's summary for ``attendance_date``.
+
+    ``statuses`` is a status name or an iterable of them (one per row). The
+    common case is a single UPDATE; the first write of a session creates the
+    summary row. Returns whether it did.
+    """
+    if isinstance(statuses, str):
+        statuses = [statuses]
+    increments = {STATUS_FIELDS[status]: n for status, n in Counter(statuses).items()}
+
+    if _bump(class_id, attendance_date, increments):
+        return False
+
+    if enrolled_count is None:
+        enrolled_count = Enrollment.objects.filter(class_obj_id=class_id).count()
+    try:
+        with transaction.atomic():
+            AttendanceDailySummary.objects.create(
+                class_obj_id=class_id,
+                date=attendance_date,
+                enrolled_count=enrolled_count,
+                **increments,
+            )
+    except IntegrityError:
+        # Another writer created the row first
+        _bump(class_id, attendance_date, increments)
+        return False
+    return True
+
+
+def remove_attendance(class_id, attendance_date, statuses):
+    """Take deleted (or re-dated) attendance rows back out of the class's summary."""
+    if isinstance(statuses, str):
+        statuses = [statuses]
+    _bump(class_id, attendance_date, {STATUS_FIELDS[status]: -n for status, n in Counter(statuses).items()})
+    # A rebuild has no row for a day without attendance, so don't keep an empty one
+    AttendanceDailySummary.objects.filter(
+        class_obj_id=class_id, date=attendance_date, **{field: 0 for field in STATUS_FIELDS.values()},
+    ).delete()
+
+
+def remove_absences(class_id, attendance_date, count=1):
+    """Take absent rows replaced by late scans back out of the class's summary."""
+    _bump(class_id, attendance_date, {'absent_count': -count})
+
+
+def archived_through(class_ids=None):
+    """Last archived attendance date per class; summaries up to it can't be recomputed."""
+    archives = AttendanceArchive.objects.order_by().values('class_obj_id')
+    if class_ids is not None:
+        archives = archives.filter(class_obj_id__in=class_ids)
+    return dict(archives.annotate(last=Max('last_date')).values_list('class_obj_id', 'last'))
+
+
+def _is_archived(archived, class_id, day):
+    return class_id in archived and day <= archived[class_id]
+
+
+def summarize_attendance(class_ids=None):
+    """Compute summary rows from raw attendance, keyed by (class_id, date)."""
+    attendance = Attendance.objects.all()
+    if class_ids is not None:
+        attendance = attendance.filter(class_obj_id__in=class_ids)
+    rows = attendance.order_by().values('class_obj_id', 'attendance_date').annotate(
+        **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()}
+    )
+
+    enrolled = dict(
+        Enrollment.objects.order_by().values('class_obj_id')
+        .annotate(n=Count('id')).values_list('class_obj_id', 'n')
+    )
+    return {
+        (row['class_obj_id'], row['attendance_date']): AttendanceDailySummary(
+            class_obj_id=row['class_obj_id'],
+            date=row['attendance_date'],
+            enrolled_count=enrolled.get(row['class_obj_id'], 0),
+            **{field: row[field] for field in STATUS_FIELDS.values()},
+        )
+        for row in rows.iterator()
+    }
+
+
+def refresh_session_counts(class_ids=None):
+    """Recompute each class's session count and last session date from its sessions."""
+    sessions = ClassSession.objects.order_by().values('class_obj_id').annotate(
+        n=Count('id'), last=Max('date'),
+    )
+    classes = Class.objects.all()
+    if class_ids is not None:
+        classes = classes.filter(pk__in=class_ids)
+        sessions = sessions.filter(class_obj_id__in=class_ids)
+
+    totals = {row['class_obj_id']: (row['n'], row['last']) for row in sessions}
+    with transaction.atomic():
+        classes.exclude(pk__in=totals).update(session_count=0, last_session_date=None)
+        for class_id, (n, last) in totals.items():
+            Class.objects.filter(pk=class_id).update(session_count=n, last_session_date=last)
+
+
+def rebuild_daily_summaries(class_ids=None):
+    """
+    Replace summary rows (and session counts) with ones recomputed from raw
+    attendance. Rows for days already archived are kept as they are, and
+    attendance without a session gets one.
+    """
+    archived = archived_through(class_ids)
+    summaries = [
+        summary for (class_id, day), summary in summarize_attendance(class_ids).items()
+        if not _is_archived(archived, class_id, day)
+    ]
+    existing = AttendanceDailySummary.objects.all()
+    if class_ids is not None:
+        existing = existing.filter(class_obj_id__in=class_ids)
+    with transaction.atomic():
+        kept = Q()
+        for class_id, last in archived.items():
+            kept |= Q(class_obj_id=class_id, date__lte=last)
+        existing.exclude(kept).delete()
+        AttendanceDailySummary.objects.bulk_create(summaries, batch_size=1000)
+        ensure_sessions(class_ids)
+        refresh_session_counts(class_ids)
+        invalidate_all()
+    return len(summaries)
+
+
+def verify_daily_summaries(class_ids=None):
+    """
+    Compare stored summary rows with raw attendance, skipping archived days.
+
+    Returns a list of ``(class_id, date, stored, expected)`` tuples for every
+    mismatch, where each side is a ``(present, late, absent)`` tuple or None.
+    Enrolled counts are not compared: they are snapshots taken when the
+    session started.
+    """
+    archived = archived_through(class_ids)
+    expected = summarize_attendance(class_ids)
+    stored = AttendanceDailySummary.objects.all()
+    if class_ids is not None:
+        stored = stored.filter(class_obj_id__in=class_ids)
+    stored = {(row.class_obj_id, row.date): row for row in stored.iterator()}
+
+    def counts(row):
+        return None if row is None else tuple(getattr(row, field) for field in STATUS_FIELDS.values())
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if _is_archived(archived, *key):
+            continue
+        if counts(stored.get(key)) != counts(expected.get(key)):
+            mismatches.append(key + (counts(stored.get(key)), counts(expected.get(key))))
+    return mismatches
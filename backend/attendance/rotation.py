@@ -0,0 +1,71 @@
+"""
+Server-side QR token rotation.
+
+Tokens created with ``rotate_until`` are rotated by the scheduler instead of
+by clients calling GenerateQRView. Shortly before the current token expires,
+every due class gets its successor in one bulk insert, and the outgoing
+tokens get a short grace extension so scans in flight at the boundary still
+succeed. Web workers whose cache still holds the old expiry re-read the
+token before rejecting a scan (see ``validate_scan``).
+
+``qr_rotated`` events go through the configured ATTENDANCE_BROKER. The
+default in-process broker only reaches stream clients of the process the
+scheduler runs in, so live rotation events need either
+QR_ROTATION_IN_PROCESS or a cross-process broker.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import QRToken
+from .realtime import publish
+from .scanning import scan_cache
+from .serializers import QRTokenSerializer
+
+
+def rotate_due_tokens(now=None):
+    """
+    Issue successors for every rotating session whose newest token expires
+    within QR_ROTATION_LEAD_SECONDS. Returns the new tokens.
+    """
+    now = now or timezone.now()
+    lead = timedelta(seconds=settings.QR_ROTATION_LEAD_SECONDS)
+    grace = timedelta(seconds=settings.QR_ROTATION_GRACE_SECONDS)
+
+    newer = QRToken.objects.filter(class_obj=OuterRef('class_obj'), created_at__gt=OuterRef('created_at'))
+    with transaction.atomic():
+        # Lock the due tokens so concurrent schedulers don't rotate a class twice
+        due = list(
+            QRToken.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('class_obj')
+            .filter(rotate_until__gt=now, expires_at__lte=now + lead)
+            .filter(~Exists(newer))
+        )
+        if not due:
+            return []
+
+        successors = QRToken.objects.bulk_create([
+            QRToken(
+                class_obj=token.class_obj,
+                created_by_id=token.created_by_id,
+                expires_at=now + timedelta(seconds=settings.QR_EXPIRY_SECONDS),
+                latitude=token.latitude,
+                longitude=token.longitude,
+                radius_meters=token.radius_meters,
+                rotate_until=token.rotate_until,
+                session_started_at=token.session_started_at or token.created_at,
+                session_id=token.session_id,
+            )
+            for token in due
+        ])
+        QRToken.objects.filter(pk__in=[token.pk for token in due]).update(expires_at=F('expires_at') + grace)
+
+    for token in successors:
+        # Cached copies of the outgoing token carry its old expiry (only this
+        # process's; other workers re-read it when it looks expired)
+        scan_cache.invalidate_class_tokens(token.class_obj_id)
+        publish(token.class_obj_id, 'qr_rotated', qr=QRTokenSerializer(token).data)
+    return successors
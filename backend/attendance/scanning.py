@@ -0,0 +1,548 @@
+"""
+Scan validation engine.
+
+Keeps a process-local cache of QR tokens and class rosters, keyed by token
+UUID and class id, so a valid scan does not have to re-read the token, the
+class or the enrollment table from the database. Signed codes (see
+``attendance.signed_tokens``) are verified in place and never cached.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from classes.models import Class, Enrollment
+from config.response_cache import invalidate
+from .geo import haversine_distance
+from .models import Attendance, QRToken
+from .realtime import publish
+from .rollups import record_attendance, remove_absences
+from .sessions import open_session
+from .serializers import ScanRecordSerializer
+from .signed_tokens import denylist, is_signed_token, verify
+
+DUPLICATE_CONSTRAINT = 'uniq_attendance_student_class_date'
+DEVICE_CONSTRAINT = 'uniq_attendance_class_date_device'
+
+
+# Column order matches CachedToken's constructor
+TOKEN_FIELDS = (
+    'token', 'class_obj_id', 'class_obj__subject_name', 'class_obj__teacher_id',
+    'created_at', 'expires_at', 'latitude', 'longitude', 'radius_meters',
+    'session_started_at',
+)
+
+
+class ScanError(Exception):
+    """A scan was rejected; carries the API error message and HTTP status."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class CachedToken:
+    """Immutable snapshot of a QRToken row and the class it belongs to."""
+    __slots__ = (
+        'token', 'class_id', 'class_name', 'teacher_id', 'created_at',
+        'expires_at', 'latitude', 'longitude', 'radius_meters', 'started_at',
+    )
+
+    def __init__(self, token, class_id, class_name, teacher_id, created_at,
+                 expires_at, latitude, longitude, radius_meters, session_started_at=None):
+        self.token = token
+        self.class_id = class_id
+        self.class_name = class_name
+        self.teacher_id = teacher_id
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_meters = radius_meters
+        # Rotated tokens measure lateness from the start of their session
+        self.started_at = session_started_at or created_at
+
+    @property
+    def is_expired(self):
+        return timezone.now() > self.expires_at
+
+    @property
+    def has_geofence(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def class_instance(self):
+        """Unsaved-looking Class carrying the cached name, for FK assignment."""
+        return Class(id=self.class_id, subject_name=self.class_name, teacher_id=self.teacher_id)
+
+
+def token_key(token):
+    """Canonical lookup key for a scanned code, or None if it can't be one of ours."""
+    if is_signed_token(token):
+        return token
+    try:
+        return str(uuid.UUID(str(token)))
+    except ValueError:
+        return None
+
+
+class ScanCache:
+    """
+    Process-local token, class, session and roster cache.
+
+    Entries are dropped when the class rotates its token or its enrollments
+    change. Other worker processes only see those changes once their own
+    entries are invalidated or expire, which for tokens and rosters is
+    bounded by QR_EXPIRY_SECONDS. A token that looks expired is re-read before the scan
+    is rejected, since the rotation scheduler may have extended it from
+    another process.
+    """
+    MAX_TOKENS = 10000
+    MAX_SESSIONS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._classes = {}
+        self._sessions = {}
+        self._rosters = {}
+        self._roster_generation = {}
+
+    def get_token(self, token):
+        token = token_key(token)
+        if token is None:
+            return None
+        if is_signed_token(token):
+            return self._signed_entry(token)
+
+        entry = self._tokens.get(token)
+        if entry is not None:
+            return entry
+
+        row = QRToken.objects.filter(token=token).values_list(*TOKEN_FIELDS).first()
+        if row is None:
+            return None
+
+        entry = CachedToken(*row)
+        with self._lock:
+            if len(self._tokens) >= self.MAX_TOKENS:
+                self._evict_expired()
+            self._tokens[token] = entry
+        return entry
+
+    def reload_token(self, token):
+        """Re-read a database token, replacing its cached entry; None if it's gone."""
+        key = token_key(token)
+        if key is not None and not is_signed_token(key):
+            with self._lock:
+                self._tokens.pop(key, None)
+        return self.get_token(token)
+
+    def _signed_entry(self, token):
+        signed = verify(token)
+        if signed is None:
+            return None
+        class_row = self.get_class(signed.class_id)
+        if class_row is None:
+            return None
+        return CachedToken(
+            token, signed.class_id, *class_row,
+            created_at=signed.issued_at,
+            expires_at=denylist.expires_at(signed),
+            latitude=signed.latitude,
+            longitude=signed.longitude,
+            radius_meters=signed.radius_meters,
+            session_started_at=signed.session_started_at,
+        )
+
+    def get_class(self, class_id):
+        """(subject_name, teacher_id) for a class, or None if it doesn't exist."""
+        class_row = self._classes.get(class_id)
+        if class_row is not None:
+            return class_row
+        class_row = Class.objects.filter(pk=class_id).values_list('subject_name', 'teacher_id').first()
+        if class_row is not None:
+            with self._lock:
+                self._classes[class_id] = class_row
+        return class_row
+
+    def get_roster(self, class_id):
+        cached = self._rosters.get(class_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        generation = self._roster_generation.get(class_id, 0)
+        roster = frozenset(
+            Enrollment.objects.filter(class_obj_id=class_id).values_list('student_id', flat=True)
+        )
+        with self._lock:
+            # Don't store a roster that was invalidated while we were reading it.
+            if self._roster_generation.get(class_id, 0) == generation:
+                # Expire it too: other processes' enrollment writes never invalidate it
+                self._rosters[class_id] = (roster, time.monotonic() + settings.QR_EXPIRY_SECONDS)
+        return roster
+
+    def get_session_id(self, class_id, day):
+        """Id of the class's session on ``day``, opening one if a scan arrives without it."""
+        session_id = self._sessions.get((class_id, day))
+        if session_id is None:
+            session_id = open_session(class_id, day).id
+            with self._lock:
+                if len(self._sessions) >= self.MAX_SESSIONS:
+                    self._sessions = {}
+                self._sessions[(class_id, day)] = session_id
+        return session_id
+
+    def is_enrolled(self, class_id, student_id):
+        return student_id in self.get_roster(class_id)
+
+    def invalidate_class_tokens(self, class_id):
+        with self._lock:
+            self._tokens = {
+                key: entry for key, entry in self._tokens.items()
+                if entry.class_id != class_id
+            }
+            self._classes.pop(class_id, None)
+            self._sessions = {key: value for key, value in self._sessions.items() if key[0] != class_id}
+
+    def invalidate_roster(self, class_id):
+        with self._lock:
+            self._roster_generation[class_id] = self._roster_generation.get(class_id, 0) + 1
+            self._rosters.pop(class_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens = {}
+            self._classes = {}
+            self._sessions = {}
+            self._rosters = {}
+            self._roster_generation = {}
+
+    def _evict_expired(self):
+        now = timezone.now()
+        self._tokens = {
+            key: entry for key, entry in self._tokens.items()
+            if entry.expires_at >= now
+        }
+        if len(self._tokens) >= self.MAX_TOKENS:
+            self._tokens = {}
+
+
+scan_cache = ScanCache()
+
+
+def validate_scan(student_id, token):
+    """
+    Validate a scan's token and the student's enrollment against the cache.
+
+    Returns the CachedToken, or raises ScanError when the scan must be rejected.
+    """
+    entry = scan_cache.get_token(token)
+    if entry is None:
+        raise ScanError('Invalid QR code')
+
+    if entry.is_expired:
+        # The cached expiry may predate a rotation grace extension
+        entry = scan_cache.reload_token(token)
+        if entry is None or entry.is_expired:
+            raise ScanError('QR code has expired. Ask teacher to generate a new one.')
+
+    if not scan_cache.is_enrolled(entry.class_id, student_id):
+        raise ScanError('You are not enrolled in this class', status.HTTP_403_FORBIDDEN)
+
+    return entry
+
+
+def check_geofence(entry, latitude, longitude):
+    """Return the distance from the token's fence, or raise ScanError if outside it."""
+    if not entry.has_geofence:
+        return None
+    if latitude is None or longitude is None:
+        raise ScanError('Location access is required. Please enable GPS and try again.')
+    distance = haversine_distance(entry.latitude, entry.longitude, latitude, longitude)
+    if distance > entry.radius_meters:
+        raise ScanError(
+            f'You are {int(distance)}m away from the classroom. You must be within {entry.radius_meters}m to mark attendance.',
+            status.HTTP_403_FORBIDDEN,
+        )
+    return distance
+
+
+def _violated_constraint(exc):
+    """Name of the unique constraint behind an IntegrityError, if it is one of ours."""
+    diag = getattr(exc.__cause__, 'diag', None)
+    name = getattr(diag, 'constraint_name', None)
+    if name:
+        return name
+    # Backends without diagnostics (SQLite) only report the offending columns
+    message = str(exc)
+    if 'UNIQUE' not in message.upper():
+        return None
+    return DEVICE_CONSTRAINT if 'device_id' in message else DUPLICATE_CONSTRAINT
+
+
+def _create_attendance(fields):
+    # A savepoint keeps a failed insert from poisoning the enclosing transaction
+    with transaction.atomic():
+        return Attendance.objects.create(**fields)
+
+
+def _replace_absence(fields):
+    """Swap the absent row a closed session left for the student for this scan; None if there is none."""
+    with transaction.atomic():
+        deleted, _ = Attendance.objects.filter(
+            student=fields['student'],
+            class_obj=fields['class_obj'],
+            attendance_date=fields['attendance_date'],
+            status='absent',
+        ).delete()
+        if not deleted:
+            return None
+        # A new row (rather than an UPDATE) so incremental readers keyed on id see the scan
+        return Attendance.objects.create(**fields)
+
+
+def commit_scan(**fields):
+    """
+    Insert an attendance row, letting the database enforce uniqueness.
+
+    Conflicts on the per-day and per-device constraints are mapped to the
+    same errors the scan endpoint has always returned. The row is linked to
+    the class's session for the day. A scan arriving after its session was
+    closed replaces the student's absent row. The class's daily summary is
+    updated in the same transaction.
+    """
+    fields['session_id'] = scan_cache.get_session_id(fields['class_obj'].id, fields['attendance_date'])
+    # One transaction for the row and its rollup, so the response cache
+    # invalidation (on commit) only runs once both are written
+    with transaction.atomic():
+        replaced_absence = False
+        try:
+            try:
+                attendance = _create_attendance(fields)
+            except IntegrityError as exc:
+                if _violated_constraint(exc) != DUPLICATE_CONSTRAINT:
+                    raise
+                attendance = _replace_absence(fields)
+                if attendance is None:
+                    raise
+                replaced_absence = True
+        except IntegrityError as exc:
+            constraint = _violated_constraint(exc)
+            if constraint == DEVICE_CONSTRAINT and Attendance.objects.filter(
+                student=fields['student'],
+                class_obj=fields['class_obj'],
+                attendance_date=fields['attendance_date'],
+            ).exclude(status='absent').exists():
+                # A rescan from the student's own device trips both constraints;
+                # the database only reports the first one it checked.
+                constraint = DUPLICATE_CONSTRAINT
+            if constraint == DUPLICATE_CONSTRAINT:
+                raise ScanError('Attendance already marked for today') from exc
+            if constraint == DEVICE_CONSTRAINT:
+                raise ScanError(
+                    'This device was already used to mark attendance for another student. Proxy attendance is not allowed.',
+                    status.HTTP_403_FORBIDDEN,
+                ) from exc
+            raise
+
+        if replaced_absence:
+            remove_absences(attendance.class_obj_id, attendance.attendance_date)
+        record_attendance(
+            attendance.class_obj_id,
+            attendance.attendance_date,
+            attendance.status,
+            enrolled_count=len(scan_cache.get_roster(attendance.class_obj_id)),
+        )
+    publish_scan(attendance, replaced_absence)
+    return attendance
+
+
+def publish_scan(attendance, replaced_absence=False):
+    """Tell live dashboards about a new attendance row."""
+    publish(
+        attendance.class_obj_id,
+        'scan',
+        student_id=attendance.student_id,
+        student_name=attendance.student.name,
+        status=attendance.status,
+        attendance_date=attendance.attendance_date.isoformat(),
+        marked_at=attendance.marked_at,
+        replaced_absence=replaced_absence,
+    )
+
+
+# How far ahead of the server clock a device timestamp may be
+CLIENT_CLOCK_SKEW = timedelta(seconds=60)
+
+
+def _rejected(index, message, status_code=status.HTTP_400_BAD_REQUEST):
+    return {'index': index, 'result': 'rejected', 'error': message, 'status_code': status_code}
+
+
+def process_scan_batch(student, records, ip_address=None):
+    """
+    Validate and store a batch of offline scans for one student.
+
+    Tokens, enrollments and existing attendance are each loaded with a single
+    query for the whole batch, and accepted rows are written with one
+    bulk_create. Late/present is decided from the device's scan time relative
+    to the token's creation, and scans made after the token stopped being
+    valid are rejected. Returns one result dict per record, in input order.
+    """
+    results = [None] * len(records)
+    pending = []  # (index, validated data)
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            results[index] = _rejected(index, 'Each record must be a JSON object.')
+            continue
+        serializer = ScanRecordSerializer(data=record)
+        if not serializer.is_valid():
+            results[index] = _rejected(index, serializer.errors)
+            continue
+        pending.append((index, serializer.validated_data))
+
+    now = timezone.now()
+    oldest = now - timedelta(seconds=settings.OFFLINE_SCAN_MAX_AGE_SECONDS)
+
+    # 1. Tokens: signed codes are verified in place, the rest loaded in one query
+    keys = {index: token_key(data['token']) for index, data in pending}
+    tokens = {}
+    row_tokens = set()
+    for key in keys.values():
+        if key is None or key in tokens:
+            continue
+        if is_signed_token(key):
+            entry = scan_cache.get_token(key)
+            if entry is not None:
+                tokens[key] = entry
+        else:
+            row_tokens.add(key)
+    if row_tokens:
+        tokens.update(
+            (str(row[0]), CachedToken(*row))
+            for row in QRToken.objects.filter(token__in=row_tokens).values_list(*TOKEN_FIELDS)
+        )
+
+    # 2. Enrollments
+    enrolled = set(
+        Enrollment.objects.filter(
+            student=student,
+            class_obj_id__in={entry.class_id for entry in tokens.values()},
+        ).values_list('class_obj_id', flat=True)
+    )
+
+    candidates = []  # (index, data, entry, attendance_date)
+    for index, data in pending:
+        entry = tokens.get(keys[index])
+        scanned_at = data['scanned_at']
+        if entry is None:
+            results[index] = _rejected(index, 'Invalid QR code')
+        elif scanned_at > now + CLIENT_CLOCK_SKEW or scanned_at < entry.created_at - CLIENT_CLOCK_SKEW:
+            results[index] = _rejected(index, 'Scan time is outside the QR code\'s lifetime')
+        elif scanned_at > entry.expires_at or entry.expires_at < oldest:
+            results[index] = _rejected(index, 'QR code had expired when it was scanned.')
+        elif entry.class_id not in enrolled:
+            results[index] = _rejected(index, 'You are not enrolled in this class', status.HTTP_403_FORBIDDEN)
+        else:
+            try:
+                check_geofence(entry, data.get('latitude'), data.get('longitude'))
+            except ScanError as exc:
+                results[index] = _rejected(index, exc.message, exc.status_code)
+                continue
+            candidates.append((index, data, entry, timezone.localdate(scanned_at)))
+
+    # 3. Existing attendance for this student, or for any device in the batch
+    devices = {data.get('device_id') for _, data, _, _ in candidates} - {None, ''}
+    existing_students = set()
+    existing_absences = set()  # left by closed sessions; a scan replaces them
+    existing_devices = set()
+    if candidates:
+        for student_id, class_id, attendance_date, device_id, attendance_status in Attendance.objects.filter(
+            Q(student=student) | Q(device_id__in=devices),
+            class_obj_id__in={entry.class_id for _, _, entry, _ in candidates},
+            attendance_date__in={day for _, _, _, day in candidates},
+        ).values_list('student_id', 'class_obj_id', 'attendance_date', 'device_id', 'status'):
+            if student_id == student.id and attendance_status == 'absent':
+                existing_absences.add((class_id, attendance_date))
+            elif student_id == student.id:
+                existing_students.add((class_id, attendance_date))
+            elif device_id:
+                existing_devices.add((class_id, attendance_date, device_id))
+
+    to_create = []  # (index, Attendance)
+    replacements = []  # (index, Attendance) replacing an absent row
+    for index, data, entry, attendance_date in candidates:
+        device_id = data.get('device_id', '')
+        key = (entry.class_id, attendance_date)
+        if key in existing_students:
+            results[index] = _rejected(index, 'Attendance already marked for that day')
+            continue
+        if device_id and key + (device_id,) in existing_devices:
+            results[index] = _rejected(
+                index,
+                'This device was already used to mark attendance for another student. Proxy attendance is not allowed.',
+                status.HTTP_403_FORBIDDEN,
+            )
+            continue
+        existing_students.add(key)  # later duplicates in the same batch
+
+        time_diff = (data['scanned_at'] - entry.started_at).total_seconds()
+        (replacements if key in existing_absences else to_create).append((index, Attendance(
+            student=student,
+            class_obj=entry.class_instance(),
+            attendance_date=attendance_date,
+            session_id=scan_cache.get_session_id(entry.class_id, attendance_date),
+            status='late' if time_diff > settings.LATE_THRESHOLD_SECONDS else 'present',
+            device_id=device_id,
+            ip_address=ip_address,
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
+        )))
+
+    # 4. Insert; if a concurrent scan won a race, retry row by row so the
+    # constraint errors land on the right records. Scans replacing an absent
+    # row always go row by row.
+    try:
+        with transaction.atomic():
+            Attendance.objects.bulk_create([row for _, row in to_create])
+    except IntegrityError:
+        created = []
+        replacements = to_create + replacements
+    else:
+        created = list(to_create)
+        sessions = defaultdict(list)
+        for _, row in created:
+            sessions[(row.class_obj_id, row.attendance_date)].append(row.status)
+        for (class_id, attendance_date), statuses in sessions.items():
+            record_attendance(class_id, attendance_date, statuses)
+        if sessions:
+            # bulk_create skips the post_save receiver that invalidates single scans
+            invalidate(classes=[class_id for class_id, _ in sessions], students=[student.id])
+        for _, row in created:
+            publish_scan(row)
+
+    for index, row in replacements:
+        try:
+            row = commit_scan(**{
+                field: getattr(row, field) for field in (
+                    'student', 'class_obj', 'attendance_date', 'status',
+                    'device_id', 'ip_address', 'latitude', 'longitude',
+                )
+            })
+        except ScanError as exc:
+            results[index] = _rejected(index, exc.message, exc.status_code)
+            continue
+        created.append((index, row))
+
+    for index, row in created:
+        results[index] = {'index': index, 'result': 'marked', 'attendance': row}
+    return results
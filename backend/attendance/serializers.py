@@ -1,5 +1,8 @@
+import math
+
+from django.conf import settings
 from rest_framework import serializers
-from .models import Attendance, QRToken
+from .models import Attendance, ClassSession, QRToken, ScanAnomaly
 
 
 class QRTokenSerializer(serializers.ModelSerializer):
@@ -8,8 +11,17 @@ class QRTokenSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = QRToken
-        fields = ['id', 'class_obj', 'class_name', 'token', 'created_at', 'expires_at', 'is_expired', 'latitude', 'longitude', 'radius_meters']
-        read_only_fields = ['id', 'token', 'created_at', 'expires_at']
+        fields = ['id', 'class_obj', 'class_name', 'token', 'created_at', 'expires_at', 'is_expired', 'latitude', 'longitude', 'radius_meters', 'rotate_until']
+        read_only_fields = ['id', 'token', 'created_at', 'expires_at', 'rotate_until']
+
+
+class ClassSessionSerializer(serializers.ModelSerializer):
+    class_name = serializers.CharField(source='class_obj.subject_name', read_only=True)
+
+    class Meta:
+        model = ClassSession
+        fields = ['id', 'class_obj', 'class_name', 'date', 'started_at', 'ended_at']
+        read_only_fields = fields
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
@@ -21,19 +33,68 @@ class AttendanceSerializer(serializers.ModelSerializer):
         model = Attendance
         fields = [
             'id', 'student', 'student_name', 'student_email',
-            'class_obj', 'class_name', 'attendance_date',
+            'class_obj', 'class_name', 'attendance_date', 'session',
             'status', 'marked_at'
         ]
         read_only_fields = ['id', 'marked_at']
 
 
+class FiniteFloatField(serializers.FloatField):
+    """A FloatField that rejects nan, which passes the min/max validators, and infinity."""
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not math.isfinite(value):
+            self.fail('invalid')
+        return value
+
+
+class GeofenceSerializer(serializers.Serializer):
+    """A geofence centre and radius; the ranges fit what a signed code can carry."""
+    latitude = FiniteFloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    longitude = FiniteFloatField(required=False, allow_null=True, min_value=-180, max_value=180)
+    radius_meters = serializers.IntegerField(required=False, default=100, min_value=1, max_value=2**31 - 1)
+
+    def to_internal_value(self, data):
+        # Form posts send empty strings for options left unset
+        return super().to_internal_value({key: value for key, value in data.items() if value != ''})
+
+
+class GenerateQRSerializer(GeofenceSerializer):
+    """Geofence and rotation options for GenerateQRView."""
+    rotate_minutes = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
+    def validate_rotate_minutes(self, value):
+        if value is not None and value > settings.QR_ROTATION_MAX_MINUTES:
+            raise serializers.ValidationError(
+                f'Ensure this value is less than or equal to {settings.QR_ROTATION_MAX_MINUTES}.'
+            )
+        return value
+
+
 class ScanQRSerializer(serializers.Serializer):
-    token = serializers.UUIDField()
+    # A QRToken UUID or a signed code, depending on QR_TOKEN_MODE
+    token = serializers.CharField(max_length=255)
     device_id = serializers.CharField(required=False, allow_blank=True)
     latitude = serializers.FloatField(required=False, allow_null=True)
     longitude = serializers.FloatField(required=False, allow_null=True)
 
 
+class ScanRecordSerializer(ScanQRSerializer):
+    """A scan queued on the device while offline, replayed later."""
+    scanned_at = serializers.DateTimeField()
+
+
+class ScanBatchSerializer(serializers.Serializer):
+    # Records (even ones that aren't objects) are validated one by one in
+    # process_scan_batch, so a bad record doesn't reject the batch
+    records = serializers.ListField(
+        child=serializers.JSONField(allow_null=True),
+        allow_empty=False,
+        max_length=settings.OFFLINE_SCAN_BATCH_SIZE,
+    )
+
+
 class AttendanceStatsSerializer(serializers.Serializer):
     class_id = serializers.IntegerField()
     class_name = serializers.CharField()
@@ -42,3 +103,17 @@ class AttendanceStatsSerializer(serializers.Serializer):
     absent_count = serializers.IntegerField()
     late_count = serializers.IntegerField()
     percentage = serializers.FloatField()
+
+
+class ScanAnomalySerializer(serializers.ModelSerializer):
+    class_name = serializers.CharField(source='class_obj.subject_name', read_only=True)
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = ScanAnomaly
+        fields = [
+            'id', 'class_obj', 'class_name', 'kind', 'kind_display', 'value',
+            'student_ids', 'student_count', 'occurrences', 'first_date', 'last_date',
+            'detected_at', 'updated_at',
+        ]
+        read_only_fields = fields
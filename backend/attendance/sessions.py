@@ -0,0 +1,68 @@
+"""
+Class sessions.
+
+A ClassSession is one meeting of a class on a day. GenerateQRView opens it
+with the day's first code; later codes, the rotation scheduler's successors
+and every attendance row of that day point back at it. Opening a session is
+what advances the class's session count, so a session counts even when
+nobody scans, and stats never have to count distinct attendance dates.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from classes.models import Class
+from config.response_cache import invalidate
+from .models import Attendance, ClassSession
+
+
+def _record_new_session(class_id, day):
+    Class.objects.filter(pk=class_id).update(
+        session_count=F('session_count') + 1,
+        last_session_date=Greatest(Coalesce('last_session_date', Value(day)), Value(day)),
+    )
+    # Every enrolled student's stats count the new session
+    invalidate(classes=[class_id])
+
+
+def open_session(class_id, day, started_at=None, created_by=None):
+    """The class's session for ``day``, created (and counted) if it doesn't exist yet."""
+    session = ClassSession.objects.filter(class_obj_id=class_id, date=day).first()
+    if session is not None:
+        return session
+    try:
+        with transaction.atomic():
+            session = ClassSession.objects.create(
+                class_obj_id=class_id,
+                date=day,
+                started_at=started_at or timezone.now(),
+                created_by=created_by,
+            )
+    except IntegrityError:
+        # Another request opened it first
+        return ClassSession.objects.get(class_obj_id=class_id, date=day)
+    _record_new_session(class_id, day)
+    return session
+
+
+def ensure_sessions(class_ids=None):
+    """
+    Create sessions for class-days that have attendance but no session (rows
+    written outside the scan paths) and link those rows to them. Session
+    counts are left to the caller (see ``rollups.refresh_session_counts``).
+    """
+    unlinked = Attendance.objects.filter(session__isnull=True)
+    if class_ids is not None:
+        unlinked = unlinked.filter(class_obj_id__in=class_ids)
+    days = unlinked.order_by().values_list('class_obj_id', 'attendance_date').distinct()
+    ClassSession.objects.bulk_create(
+        [ClassSession(class_obj_id=class_id, date=day, started_at=timezone.now()) for class_id, day in days],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    unlinked.update(session_id=Subquery(
+        ClassSession.objects.filter(
+            class_obj_id=OuterRef('class_obj_id'), date=OuterRef('attendance_date'),
+        ).values('id')[:1]
+    ))
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from classes.models import Class, Enrollment
+from classes.signals import roster_changed
+from config.response_cache import invalidate
+from .models import Attendance
+from .scanning import scan_cache
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_scan_roster(sender, instance, **kwargs):
+    """Drop the cached roster whenever a class's enrollments change."""
+    scan_cache.invalidate_roster(instance.class_obj_id)
+
+
+@receiver(roster_changed)
+def invalidate_imported_roster(sender, class_id, student_ids=(), **kwargs):
+    scan_cache.invalidate_roster(class_id)
+    # Imports may also have created student accounts
+    invalidate(classes=[class_id], students=student_ids, student_set=True)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_enrollment_responses(sender, instance, **kwargs):
+    invalidate(classes=[instance.class_obj_id], students=[instance.student_id])
+
+
+@receiver(post_save, sender=Attendance)
+def invalidate_attendance_responses(sender, instance, **kwargs):
+    """
+    Single-row writes (scans, admin edits). Bulk inserts and all deletes
+    (reaper, admin) skip signals and call ``invalidate`` themselves.
+    """
+    invalidate(classes=[instance.class_obj_id], students=[instance.student_id])
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def invalidate_scan_class(sender, instance, **kwargs):
+    """Cached tokens carry the class name and teacher, so drop them on class changes."""
+    scan_cache.invalidate_class_tokens(instance.id)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def invalidate_class_responses(sender, instance, created=True, **kwargs):
+    # The teacher scope is bumped on every save in case the class was reassigned
+    teachers = [instance.teacher_id] if instance.teacher_id else []
+    invalidate(classes=[instance.id], teachers=teachers, class_set=created)
+
+
+def start_rotation_worker(sender, **kwargs):
+    """Start the in-process QR rotation scheduler with the first request."""
+    from .rotation import rotate_due_tokens
+    from .workers import start_worker
+
+    start_worker('qr-rotation', settings.QR_ROTATION_INTERVAL_SECONDS, rotate_due_tokens)
+
+
+def start_reaper_worker(sender, **kwargs):
+    """Start the in-process stale data reaper with the first request."""
+    from .reaper import reap
+    from .workers import start_worker
+
+    start_worker('reaper', settings.REAPER_INTERVAL_SECONDS, reap)
+
+
+def start_session_close_worker(sender, **kwargs):
+    """Start the in-process absent marking job with the first request."""
+    from .absences import close_finished_sessions
+    from .workers import start_worker
+
+    start_worker('session-close', settings.SESSION_CLOSE_INTERVAL_SECONDS, close_finished_sessions)
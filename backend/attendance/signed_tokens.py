@@ -0,0 +1,221 @@
+"""
+Stateless HMAC-signed QR tokens.
+
+With ``QR_TOKEN_MODE = 'signed'`` the QR payload carries the class, issue
+time, expiry and geofence, authenticated with an HMAC derived from
+SECRET_KEY, so a scan is verified in CPU without reading ``qr_tokens``.
+Rotation revokes earlier tokens through a small denylist. The denylist and
+each class's current code live in the default cache, which must be shared
+(e.g. Redis) when more than one process serves requests; a system check
+rejects signed mode on a per-process cache.
+
+Payload layout (big-endian), base64url-encoded after the ``s1.`` prefix::
+
+    class_id u64 | issued_at ms u64 | expires_at s u32 | session_start s u32 |
+    lat µdeg i32 | lon µdeg i32 | radius m u32 | flags u8 | nonce u32 | mac 16B
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import secrets
+import struct
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import serializers
+
+PREFIX = 's1.'
+_PAYLOAD = struct.Struct('>QQIIiiIBI')
+_MAC_SIZE = 16
+_HAS_GEOFENCE = 0x01
+
+
+class SignedToken:
+    """Verified contents of a signed QR token."""
+    __slots__ = (
+        'token', 'class_id', 'issued_at', 'expires_at', 'session_started_at',
+        'latitude', 'longitude', 'radius_meters', 'nonce',
+    )
+
+    def __init__(self, token, class_id, issued_at, expires_at, session_started_at,
+                 latitude, longitude, radius_meters, nonce):
+        self.token = token
+        self.class_id = class_id
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.session_started_at = session_started_at
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_meters = radius_meters
+        self.nonce = nonce
+
+
+_key = None
+
+
+def _signing_key():
+    global _key
+    if _key is None:
+        _key = hashlib.sha256(b'attendance.signed_tokens' + settings.SECRET_KEY.encode()).digest()
+    return _key
+
+
+def _mac(payload):
+    return hmac.new(_signing_key(), payload, hashlib.sha256).digest()[:_MAC_SIZE]
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _from_timestamp(seconds=0, milliseconds=0):
+    return _EPOCH + timedelta(seconds=seconds, milliseconds=milliseconds)
+
+
+def is_signed_token(value):
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+
+def issue(class_id, latitude=None, longitude=None, radius_meters=100,
+          issued_at=None, expires_at=None, session_started_at=None):
+    """Return a new signed token string for ``class_id``."""
+    issued_at = issued_at or timezone.now()
+    expires_at = expires_at or issued_at + timedelta(seconds=settings.QR_EXPIRY_SECONDS)
+    session_started_at = session_started_at or issued_at
+    has_geofence = latitude is not None and longitude is not None
+
+    payload = _PAYLOAD.pack(
+        class_id,
+        int(issued_at.timestamp() * 1000),
+        int(expires_at.timestamp()),
+        int(session_started_at.timestamp()),
+        round(latitude * 1e6) if has_geofence else 0,
+        round(longitude * 1e6) if has_geofence else 0,
+        radius_meters,
+        _HAS_GEOFENCE if has_geofence else 0,
+        secrets.randbits(32),
+    )
+    return PREFIX + base64.urlsafe_b64encode(payload + _mac(payload)).rstrip(b'=').decode('ascii')
+
+
+def verify(token):
+    """Return the SignedToken if the signature is valid, else None. Expiry is not checked here."""
+    if not is_signed_token(token):
+        return None
+    encoded = token[len(PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != _PAYLOAD.size + _MAC_SIZE:
+        return None
+    payload, mac = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not hmac.compare_digest(mac, _mac(payload)):
+        return None
+
+    class_id, issued_ms, expires, session_start, lat, lon, radius, flags, nonce = _PAYLOAD.unpack(payload)
+    has_geofence = bool(flags & _HAS_GEOFENCE)
+    return SignedToken(
+        token=token,
+        class_id=class_id,
+        issued_at=_from_timestamp(milliseconds=issued_ms),
+        expires_at=_from_timestamp(expires),
+        session_started_at=_from_timestamp(session_start),
+        latitude=lat / 1e6 if has_geofence else None,
+        longitude=lon / 1e6 if has_geofence else None,
+        radius_meters=radius,
+        nonce=nonce,
+    )
+
+
+CUTOFF_KEY = 'qr:signed:cutoff:{}'
+NONCE_KEY = 'qr:signed:nonce:{}:{}'
+ACTIVE_KEY = 'qr:signed:active:{}'
+
+
+def _keep_until(expires_at):
+    """Cache timeout for state about a code: while it or offline scans made with it can still arrive."""
+    remaining = (expires_at - timezone.now()).total_seconds()
+    return max(1, int(remaining) + 1 + settings.OFFLINE_SCAN_MAX_AGE_SECONDS)
+
+
+class Denylist:
+    """
+    Revocations for signed tokens, shared between processes through the cache.
+
+    Rotating a class revokes everything issued for it before the rotation;
+    single tokens can be revoked by nonce until they expire. That is one
+    timestamp per class plus short-lived nonces, so the list stays small.
+    """
+
+    def revoke_class(self, class_id, issued_before):
+        key = CUTOFF_KEY.format(class_id)
+        current = cache.get(key)
+        if current is None or issued_before > current:
+            expires_at = issued_before + timedelta(seconds=settings.QR_EXPIRY_SECONDS)
+            cache.set(key, issued_before, _keep_until(expires_at))
+
+    def revoke(self, signed):
+        cache.set(NONCE_KEY.format(signed.class_id, signed.nonce), True, _keep_until(signed.expires_at))
+
+    def expires_at(self, signed):
+        """
+        The token's expiry, brought forward to the moment it was revoked.
+
+        Like an expired QRToken row, a rotated-out code still validates
+        offline scans made before the rotation.
+        """
+        cutoff_key = CUTOFF_KEY.format(signed.class_id)
+        nonce_key = NONCE_KEY.format(signed.class_id, signed.nonce)
+        found = cache.get_many([cutoff_key, nonce_key])
+        if nonce_key in found:
+            return signed.issued_at
+        cutoff = found.get(cutoff_key)
+        if cutoff is not None and signed.issued_at < cutoff:
+            return min(signed.expires_at, cutoff)
+        return signed.expires_at
+
+
+denylist = Denylist()
+
+
+def describe(class_obj, signed):
+    """API payload for a signed code, shaped like QRTokenSerializer's output."""
+    to_representation = serializers.DateTimeField().to_representation
+    return {
+        'id': None,
+        'class_obj': class_obj.id,
+        'class_name': class_obj.subject_name,
+        'token': signed.token,
+        'created_at': to_representation(signed.issued_at),
+        'expires_at': to_representation(signed.expires_at),
+        'is_expired': False,
+        'latitude': signed.latitude,
+        'longitude': signed.longitude,
+        'radius_meters': signed.radius_meters,
+        'rotate_until': None,
+    }
+
+
+def rotate(class_obj, **kwargs):
+    """Revoke the class's earlier signed codes and issue a new one; returns its API payload."""
+    now = timezone.now()
+    # Codes carry millisecond issue times; compare at that precision
+    issued_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    denylist.revoke_class(class_obj.id, issued_at)
+    signed = verify(issue(class_obj.id, issued_at=issued_at, **kwargs))
+    data = describe(class_obj, signed)
+    # Kept for ActiveQRView and the live stream snapshot (there is no row to look up)
+    timeout = max(1, int((signed.expires_at - now).total_seconds()) + 1)
+    cache.set(ACTIVE_KEY.format(class_obj.id), (data, signed.expires_at), timeout)
+    return data
+
+
+def active(class_id):
+    """Payload of the class's current code, or None if it has expired."""
+    issued = cache.get(ACTIVE_KEY.format(class_id))
+    if issued is None or issued[1] <= timezone.now():
+        return None
+    return issued[0]
@@ -0,0 +1,216 @@
+"""
+ASGI endpoints that push live QR rotations and scan counts to teachers.
+
+``/api/attendance/stream/<class_id>/`` is served both as Server-Sent Events
+(plain HTTP GET) and as a WebSocket. Browsers can't set headers on either, so
+the access token may be passed as ``?token=`` as well as a Bearer header.
+"""
+import asyncio
+import json
+import re
+from datetime import date
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from accounts.authentication import CachedJWTAuthentication
+from classes.models import Class
+from .models import AttendanceDailySummary, QRToken
+from .realtime import get_broker
+from . import signed_tokens
+from .serializers import QRTokenSerializer
+
+STREAM_PATH = re.compile(r'^/api/attendance/stream/(?P<class_id>\d+)/$')
+KEEPALIVE_SECONDS = 15
+
+
+def _raw_token(scope):
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                return parts[1]
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    return tokens[0] if tokens else None
+
+
+@sync_to_async
+def authorize(scope, class_id):
+    """Return True if the token belongs to an admin or the class's teacher."""
+    raw = _raw_token(scope)
+    if not raw:
+        return False
+    auth = CachedJWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return False
+    if user.role == 'admin':
+        return Class.objects.filter(pk=class_id).exists()
+    return user.role == 'teacher' and Class.objects.filter(pk=class_id, teacher_id=user.id).exists()
+
+
+@sync_to_async
+def snapshot(class_id):
+    """Current token and today's counts, sent when a client connects."""
+    if settings.QR_TOKEN_MODE == 'signed':
+        qr = signed_tokens.active(class_id)
+    else:
+        qr_token = QRToken.objects.filter(
+            class_obj_id=class_id, expires_at__gt=timezone.now()
+        ).select_related('class_obj').order_by('-created_at').first()
+        qr = QRTokenSerializer(qr_token).data if qr_token else None
+    summary = AttendanceDailySummary.objects.filter(class_obj_id=class_id, date=date.today()).first()
+    return {
+        'type': 'snapshot',
+        'class_id': class_id,
+        'qr': qr,
+        'counts': {
+            'present': summary.present_count if summary else 0,
+            'late': summary.late_count if summary else 0,
+            'absent': summary.absent_count if summary else 0,
+        },
+    }
+
+
+class LiveCounts:
+    """Tallies scan and session-close events on top of the connect-time snapshot."""
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self.day = date.today().isoformat()
+
+    def apply(self, event):
+        if event.get('attendance_date') != self.day:
+            return event
+        if event.get('type') == 'scan':
+            status = event.get('status')
+            if status in self.counts:
+                self.counts[status] += 1
+            if event.get('replaced_absence'):
+                self.counts['absent'] -= 1
+            event = {**event, 'counts': dict(self.counts)}
+        elif event.get('type') == 'session_closed':
+            self.counts['absent'] += event.get('absent', 0)
+            event = {**event, 'counts': dict(self.counts)}
+        return event
+
+
+def encode(event):
+    return json.dumps(event, cls=DjangoJSONEncoder)
+
+
+async def _next_event(subscription, receive, disconnect_type):
+    """Wait for an event; returns None on timeout and raises ConnectionError on disconnect."""
+    get_event = asyncio.ensure_future(subscription.get())
+    get_message = asyncio.ensure_future(receive())
+    done, _ = await asyncio.wait(
+        {get_event, get_message}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED,
+    )
+    if get_message in done and get_message.result()['type'] == disconnect_type:
+        get_event.cancel()
+        raise ConnectionError
+    get_message.cancel()
+    if get_event in done:
+        return get_event.result()
+    get_event.cancel()
+    return None
+
+
+async def event_stream(scope, receive, send, class_id):
+    """Server-Sent Events response."""
+    if scope['method'] != 'GET':
+        await _http_error(send, 405, 'Method not allowed')
+        return
+    if not await authorize(scope, class_id):
+        await _http_error(send, 403, 'You do not have permission to perform this action.')
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    subscription = get_broker().subscribe(class_id)
+    try:
+        initial = await snapshot(class_id)
+        live = LiveCounts(initial['counts'])
+        await send({'type': 'http.response.body', 'body': _sse(initial), 'more_body': True})
+        while True:
+            try:
+                event = await _next_event(subscription, receive, 'http.disconnect')
+            except ConnectionError:
+                return
+            body = b': keepalive\n\n' if event is None else _sse(live.apply(event))
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        subscription.close()
+
+
+async def websocket_stream(scope, receive, send, class_id):
+    """WebSocket carrying the same JSON events as the SSE stream."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if not await authorize(scope, class_id):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe(class_id)
+    try:
+        initial = await snapshot(class_id)
+        live = LiveCounts(initial['counts'])
+        await send({'type': 'websocket.send', 'text': encode(initial)})
+        while True:
+            try:
+                event = await _next_event(subscription, receive, 'websocket.disconnect')
+            except ConnectionError:
+                return
+            if event is not None:
+                await send({'type': 'websocket.send', 'text': encode(live.apply(event))})
+    finally:
+        subscription.close()
+
+
+def _sse(event):
+    return f'event: {event["type"]}\ndata: {encode(event)}\n\n'.encode('utf-8')
+
+
+async def _http_error(send, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'detail': message}).encode()})
+
+
+def stream_router(django_application):
+    """Wrap the Django ASGI app, serving the stream path and passing everything else through."""
+
+    async def application(scope, receive, send):
+        match = STREAM_PATH.match(scope.get('path', '')) if scope['type'] in ('http', 'websocket') else None
+        if match is None:
+            if scope['type'] == 'websocket':
+                await receive()
+                await send({'type': 'websocket.close', 'code': 4404})
+                return
+            await django_application(scope, receive, send)
+            return
+
+        class_id = int(match.group('class_id'))
+        if scope['type'] == 'websocket':
+            await websocket_stream(scope, receive, send, class_id)
+        else:
+            await event_stream(scope, receive, send, class_id)
+
+    return application
@@ -3,8 +3,12 @@ from .views import (
     GenerateQRView,
     ActiveQRView,
     ScanQRView,
+    ScanBatchView,
     AttendanceListView,
     AttendanceStatsView,
+    GeofenceAuditView,
+    ClassSessionListView,
+    ScanAnomalyListView,
     ExportAttendanceView,
     DashboardStatsView,
 )
@@ -13,8 +17,12 @@ urlpatterns = [
     path('qr/generate/', GenerateQRView.as_view(), name='generate_qr'),
     path('qr/active/<int:class_id>/', ActiveQRView.as_view(), name='active_qr'),
     path('scan/', ScanQRView.as_view(), name='scan_qr'),
+    path('scan/batch/', ScanBatchView.as_view(), name='scan_batch'),
     path('list/', AttendanceListView.as_view(), name='attendance_list'),
     path('stats/', AttendanceStatsView.as_view(), name='attendance_stats'),
+    path('geofence-audit/<int:class_id>/', GeofenceAuditView.as_view(), name='geofence_audit'),
+    path('sessions/', ClassSessionListView.as_view(), name='class_sessions'),
+    path('anomalies/', ScanAnomalyListView.as_view(), name='scan_anomalies'),
     path('export/', ExportAttendanceView.as_view(), name='export_attendance'),
     path('dashboard/', DashboardStatsView.as_view(), name='dashboard_stats'),
 ]
@@ -1,40 +1,55 @@
-import csv
-import math
-from datetime import date
+from datetime import date, timedelta
 
-from django.http import HttpResponse
-from django.db.models import Count, Q
+from django.db.models import Count, FilteredRelation, Max, Q, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings as django_settings
 from django.utils import timezone
 from rest_framework import generics, status
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from accounts.permissions import IsAdminOrTeacher, IsStudent
+from config.db_router import ReplicaReadMixin, replica_alias
+from config.response_cache import (
+    ALL_CLASSES, CLASS_SET, STUDENT_SET, cached_response, class_scope, query_key, student_class_ids,
+    student_scope, teacher_class_ids, teacher_scope,
+)
 from classes.models import Class, Enrollment
-from .models import Attendance, QRToken
+from .models import Attendance, AttendanceDailySummary, ClassSession, QRToken, ScanAnomaly
 from .serializers import (
     AttendanceSerializer,
+    ClassSessionSerializer,
+    GenerateQRSerializer,
+    GeofenceSerializer,
     QRTokenSerializer,
     ScanQRSerializer,
+    ScanBatchSerializer,
     AttendanceStatsSerializer,
+    ScanAnomalySerializer,
+)
+from .exports import EXPORT_FORMATS, export_rows, pyarrow, streaming_export_response
+from .geo import fence_outliers
+from .pagination import AttendanceKeysetPagination
+from .realtime import publish
+from . import signed_tokens
+from .sessions import open_session
+from .scanning import (
+    ScanError,
+    check_geofence,
+    commit_scan,
+    process_scan_batch,
+    scan_cache,
+    validate_scan,
 )
 
 # Late threshold in seconds (configurable in settings, default 15 min)
 LATE_THRESHOLD_SECONDS = getattr(django_settings, 'LATE_THRESHOLD_SECONDS', 900)
 
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance in meters between two GPS coordinates."""
-    R = 6371000  # Earth radius in meters
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+def get_client_ip(request):
+    return request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip() or request.META.get('REMOTE_ADDR')
 
 
 class GenerateQRView(APIView):
@@ -50,22 +65,58 @@ class GenerateQRView(APIView):
         except Class.DoesNotExist:
             return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Invalidate old tokens for this class
-        QRToken.objects.filter(class_obj=class_obj).delete()
+        options = GenerateQRSerializer(data=request.data)
+        options.is_valid(raise_exception=True)
 
         # Create QR with optional geofence
-        latitude = request.data.get('latitude')
-        longitude = request.data.get('longitude')
-        radius_meters = request.data.get('radius_meters', 100)
+        latitude = options.validated_data.get('latitude')
+        longitude = options.validated_data.get('longitude')
+        radius_meters = options.validated_data['radius_meters']
+
+        # Optional server-side rotation for the next N minutes
+        rotate_minutes = options.validated_data.get('rotate_minutes')
+
+        if django_settings.QR_TOKEN_MODE == 'signed':
+            if rotate_minutes:
+                return Response(
+                    {'error': 'rotate_minutes is not supported with signed QR codes'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            # No token row is written; the new code revokes the previous ones
+            open_session(class_obj.id, date.today(), created_by=request.user)
+            data = signed_tokens.rotate(
+                class_obj,
+                latitude=latitude,
+                longitude=longitude,
+                radius_meters=radius_meters,
+            )
+            publish(class_obj.id, 'qr_rotated', qr=data)
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        # Invalidate old tokens for this class. They are expired rather than
+        # deleted so queued offline scans can still be replayed against them.
+        now = timezone.now()
+        QRToken.objects.filter(class_obj=class_obj, expires_at__gt=now).update(expires_at=now)
+        QRToken.objects.filter(
+            class_obj=class_obj,
+            expires_at__lt=now - timedelta(seconds=django_settings.OFFLINE_SCAN_MAX_AGE_SECONDS),
+        ).delete()
+        scan_cache.invalidate_class_tokens(class_obj.id)
+
+        rotate_until = now + timedelta(minutes=rotate_minutes) if rotate_minutes else None
 
         qr_token = QRToken.objects.create(
             class_obj=class_obj,
+            session=open_session(class_obj.id, date.today(), started_at=now, created_by=request.user),
             created_by=request.user,
-            latitude=float(latitude) if latitude else None,
-            longitude=float(longitude) if longitude else None,
-            radius_meters=int(radius_meters),
+            latitude=latitude,
+            longitude=longitude,
+            radius_meters=radius_meters,
+            rotate_until=rotate_until,
+            session_started_at=now if rotate_until else None,
         )
         serializer = QRTokenSerializer(qr_token)
+        publish(class_obj.id, 'qr_rotated', qr=serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -74,6 +125,11 @@ class ActiveQRView(APIView):
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
 
     def get(self, request, class_id):
+        if django_settings.QR_TOKEN_MODE == 'signed':
+            data = signed_tokens.active(class_id)
+            if data is None:
+                return Response({'error': 'No active QR token'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(data)
         try:
             qr_token = QRToken.objects.filter(
                 class_obj_id=class_id,
@@ -97,72 +153,41 @@ class ScanQRView(APIView):
         latitude = serializer.validated_data.get('latitude')
         longitude = serializer.validated_data.get('longitude')
 
-        # 1. Validate token
+        # 1-3. Validate token, expiry and enrollment (served from the scan cache)
         try:
-            qr_token = QRToken.objects.get(token=token)
-        except QRToken.DoesNotExist:
-            return Response({'error': 'Invalid QR code'}, status=status.HTTP_400_BAD_REQUEST)
+            qr_token = validate_scan(request.user.id, token)
+        except ScanError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
 
-        # 2. Check expiry
-        if qr_token.is_expired:
-            return Response({'error': 'QR code has expired. Ask teacher to generate a new one.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 3. Check enrollment
-        class_obj = qr_token.class_obj
-        if not Enrollment.objects.filter(student=request.user, class_obj=class_obj).exists():
-            return Response({'error': 'You are not enrolled in this class'}, status=status.HTTP_403_FORBIDDEN)
-
-        # 4. Check duplicate attendance
-        today = date.today()
-        if Attendance.objects.filter(student=request.user, class_obj=class_obj, attendance_date=today).exists():
-            return Response({'error': 'Attendance already marked for today'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 5. Check for device reuse (anti-proxy)
-        if device_id:
-            existing_device = Attendance.objects.filter(
-                class_obj=class_obj,
-                attendance_date=today,
-                device_id=device_id
-            ).exclude(student=request.user).first()
-            if existing_device:
-                return Response(
-                    {'error': 'This device was already used to mark attendance for another student. Proxy attendance is not allowed.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-        # 6. Geofence check — if teacher set a location, verify student is within radius
-        if qr_token.latitude is not None and qr_token.longitude is not None:
-            if latitude is None or longitude is None:
-                return Response(
-                    {'error': 'Location access is required. Please enable GPS and try again.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            distance = haversine_distance(qr_token.latitude, qr_token.longitude, latitude, longitude)
-            if distance > qr_token.radius_meters:
-                return Response(
-                    {'error': f'You are {int(distance)}m away from the classroom. You must be within {qr_token.radius_meters}m to mark attendance.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        # 4. Geofence check — if teacher set a location, verify student is within radius
+        try:
+            distance = check_geofence(qr_token, latitude, longitude)
+        except ScanError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
 
-        # 7. Get client IP
-        ip_address = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip() or request.META.get('REMOTE_ADDR')
+        # 5. Get client IP
+        ip_address = get_client_ip(request)
 
-        # 8. Determine late status
-        time_diff = (timezone.now() - qr_token.created_at).total_seconds()
+        # 6. Determine late status
+        time_diff = (timezone.now() - qr_token.started_at).total_seconds()
         late_threshold_min = LATE_THRESHOLD_SECONDS / 60
         attendance_status = 'late' if time_diff > LATE_THRESHOLD_SECONDS else 'present'
 
-        # 9. Create attendance
-        attendance = Attendance.objects.create(
-            student=request.user,
-            class_obj=class_obj,
-            attendance_date=today,
-            status=attendance_status,
-            device_id=device_id,
-            ip_address=ip_address,
-            latitude=latitude,
-            longitude=longitude,
-        )
+        # 7. Create attendance; duplicates and device reuse are rejected by
+        # the table's unique constraints instead of pre-insert reads
+        try:
+            attendance = commit_scan(
+                student=request.user,
+                class_obj=qr_token.class_instance(),
+                attendance_date=date.today(),
+                status=attendance_status,
+                device_id=device_id,
+                ip_address=ip_address,
+                latitude=latitude,
+                longitude=longitude,
+            )
+        except ScanError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
 
         # Build response with late criteria info
         response_data = {
@@ -176,8 +201,7 @@ class ScanQRView(APIView):
             }
         }
 
-        if qr_token.latitude is not None:
-            distance = haversine_distance(qr_token.latitude, qr_token.longitude, latitude, longitude) if latitude else 0
+        if qr_token.has_geofence:
             response_data['location_check'] = {
                 'allowed_radius_meters': qr_token.radius_meters,
                 'your_distance_meters': int(distance),
@@ -187,14 +211,75 @@ class ScanQRView(APIView):
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class AttendanceListView(generics.ListAPIView):
-    """List attendance records with filtering."""
+class ScanBatchView(APIView):
+    """Replay scans a student's device queued while offline."""
+    permission_classes = [IsAuthenticated, IsStudent]
+
+    def post(self, request):
+        serializer = ScanBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = process_scan_batch(
+            request.user,
+            serializer.validated_data['records'],
+            ip_address=get_client_ip(request),
+        )
+        for result in results:
+            if 'attendance' in result:
+                result['attendance'] = AttendanceSerializer(result['attendance']).data
+
+        marked = sum(1 for result in results if result['result'] == 'marked')
+        return Response({
+            'marked': marked,
+            'rejected': len(results) - marked,
+            'results': results,
+        })
+
+
+class AttendanceListView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    List attendance records with filtering.
+
+    Pages by number by default; pass ``pagination=cursor`` (or follow a
+    ``cursor`` link) for keyset pagination that stays fast deep into history.
+    Pages are cached and carry ETag/Last-Modified validators that change
+    with the attendance of the classes (or student) being listed.
+    """
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = AttendanceKeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        params = request.query_params
+        student_id = user.id if user.role == 'student' else params.get('student_id')
+        if params.get('class_id'):
+            scopes = [class_scope(params['class_id'])]
+        elif student_id:
+            scopes = [student_scope(student_id)]
+            scopes += [class_scope(class_id) for class_id in student_class_ids(student_id)]
+        elif user.role == 'teacher':
+            scopes = [teacher_scope(user.id)] + [class_scope(class_id) for class_id in teacher_class_ids(user.id)]
+        else:
+            scopes = [ALL_CLASSES, CLASS_SET]
+        owner = 'admin' if user.role == 'admin' else f'{user.role}:{user.id}'
+        return cached_response(
+            request, 'attendance_list', f'{owner}@{query_key(request)}', scopes,
+            lambda: super(AttendanceListView, self).list(request, *args, **kwargs).data,
+        )
+
     def get_queryset(self):
         user = self.request.user
-        queryset = Attendance.objects.all().order_by('-attendance_date', '-marked_at')
+        queryset = Attendance.objects.select_related('student', 'class_obj').order_by('-attendance_date', '-marked_at')
 
         if user.role == 'student':
             queryset = queryset.filter(student=user)
@@ -205,11 +290,14 @@ class AttendanceListView(generics.ListAPIView):
         class_id = self.request.query_params.get('class_id')
         date_from = self.request.query_params.get('date_from')
         date_to = self.request.query_params.get('date_to')
+        session_id = self.request.query_params.get('session_id')
         student_id = self.request.query_params.get('student_id')
         status_filter = self.request.query_params.get('status')
 
         if class_id:
             queryset = queryset.filter(class_obj_id=class_id)
+        if session_id:
+            queryset = queryset.filter(session_id=session_id)
         if date_from:
             queryset = queryset.filter(attendance_date__gte=date_from)
         if date_to:
@@ -222,8 +310,11 @@ class AttendanceListView(generics.ListAPIView):
         return queryset
 
 
-class AttendanceStatsView(APIView):
-    """Get attendance statistics for a student."""
+class AttendanceStatsView(ReplicaReadMixin, APIView):
+    """
+    Get attendance statistics for a student, cached until the student's
+    attendance or enrollments, or one of their classes, change.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -231,29 +322,46 @@ class AttendanceStatsView(APIView):
         if request.user.role == 'student':
             student_id = request.user.id
 
-        enrollments = Enrollment.objects.filter(student_id=student_id).select_related('class_obj')
-        stats = []
-
-        for enrollment in enrollments:
-            class_obj = enrollment.class_obj
-            attendance_records = Attendance.objects.filter(
-                student_id=student_id,
-                class_obj=class_obj
+        scopes = [student_scope(student_id)]
+        scopes += [class_scope(class_id) for class_id in student_class_ids(student_id)]
+        return cached_response(request, 'attendance_stats', student_id, scopes, lambda: self.summarize(student_id))
+
+    @staticmethod
+    def summarize(student_id):
+        # One grouped query: each enrollment LEFT JOINed to only this
+        # student's attendance in that class, counted per status, plus the
+        # (at most one) archive row holding counts for reaped attendance. The
+        # class's session total is maintained on the class row as sessions
+        # are opened.
+        own = FilteredRelation(
+            'class_obj__attendances',
+            condition=Q(class_obj__attendances__student_id=student_id),
+        )
+        archived = FilteredRelation(
+            'class_obj__attendance_archives',
+            condition=Q(class_obj__attendance_archives__student_id=student_id),
+        )
+        rows = (
+            Enrollment.objects.filter(student_id=student_id)
+            .annotate(own=own, archived=archived)
+            .values('class_obj_id', 'class_obj__subject_name', 'class_obj__session_count')
+            .annotate(
+                present=Count('own', filter=Q(own__status='present')) + Coalesce(Max('archived__present_count'), 0),
+                absent=Count('own', filter=Q(own__status='absent')) + Coalesce(Max('archived__absent_count'), 0),
+                late=Count('own', filter=Q(own__status='late')) + Coalesce(Max('archived__late_count'), 0),
             )
-            total = attendance_records.count()
-            present = attendance_records.filter(status='present').count()
-            absent = attendance_records.filter(status='absent').count()
-            late = attendance_records.filter(status='late').count()
-
-            total_class_dates = Attendance.objects.filter(
-                class_obj=class_obj
-            ).values('attendance_date').distinct().count()
+            .order_by('id')
+        )
 
+        stats = []
+        for row in rows:
+            total_class_dates = row['class_obj__session_count']
+            present, absent, late = row['present'], row['absent'], row['late']
             percentage = (present + late) / total_class_dates * 100 if total_class_dates > 0 else 0
 
             stats.append({
-                'class_id': class_obj.id,
-                'class_name': class_obj.subject_name,
+                'class_id': row['class_obj_id'],
+                'class_name': row['class_obj__subject_name'],
                 'total_classes': total_class_dates,
                 'present_count': present,
                 'absent_count': absent,
@@ -261,78 +369,240 @@ class AttendanceStatsView(APIView):
                 'percentage': round(percentage, 2),
             })
 
-        return Response(stats)
+        return stats
 
 
-class ExportAttendanceView(APIView):
-    """Export attendance as CSV."""
+class GeofenceAuditView(APIView):
+    """
+    Re-check a class's stored scan locations against a geofence and list the
+    rows that fall outside it, farthest first.
+
+    The fence comes from ``latitude``/``longitude``/``radius_meters`` query
+    params, or else from the class's most recent geofenced QR token.
+    """
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    max_outliers = 500
+
+    def get(self, request, class_id):
+        classes = Class.objects.filter(pk=class_id)
+        if request.user.role == 'teacher':
+            classes = classes.filter(teacher=request.user)
+        if not classes.exists():
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            fence = self.get_fence(request, class_id)
+        except ValueError:
+            return Response({'error': 'Invalid latitude, longitude or radius_meters'}, status=status.HTTP_400_BAD_REQUEST)
+        if fence is None:
+            return Response(
+                {'error': 'latitude and longitude are required; this class has no geofenced QR token'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        latitude, longitude, radius_meters = fence
+
+        queryset = Attendance.objects.filter(class_obj_id=class_id)
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        if date_from:
+            queryset = queryset.filter(attendance_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(attendance_date__lte=date_to)
+
+        rows = list(
+            queryset.filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'student_id', 'student__name', 'attendance_date', 'latitude', 'longitude')
+        )
+        # Column-wise, so the whole class is checked in one vectorized call
+        latitudes = [row[4] for row in rows]
+        longitudes = [row[5] for row in rows]
+        outliers = fence_outliers(latitude, longitude, radius_meters, latitudes, longitudes)
+
+        return Response({
+            'fence': {'latitude': latitude, 'longitude': longitude, 'radius_meters': radius_meters},
+            'checked': len(rows),
+            'without_location': queryset.count() - len(rows),
+            'outside_count': len(outliers),
+            'outliers': [
+                {
+                    'id': rows[index][0],
+                    'student': rows[index][1],
+                    'student_name': rows[index][2],
+                    'attendance_date': rows[index][3],
+                    'latitude': rows[index][4],
+                    'longitude': rows[index][5],
+                    'distance_meters': int(distance),
+                }
+                for index, distance in outliers[:self.max_outliers]
+            ],
+        })
+
+    def get_fence(self, request, class_id):
+        """(latitude, longitude, radius_meters) to audit against, or None."""
+        params = request.query_params
+        if params.get('latitude') and params.get('longitude'):
+            fence = GeofenceSerializer(data=params)
+            if not fence.is_valid():
+                raise ValueError(fence.errors)
+            return (
+                fence.validated_data['latitude'],
+                fence.validated_data['longitude'],
+                fence.validated_data['radius_meters'],
+            )
+        return (
+            QRToken.objects.filter(class_obj_id=class_id, latitude__isnull=False, longitude__isnull=False)
+            .order_by('-created_at')
+            .values_list('latitude', 'longitude', 'radius_meters')
+            .first()
+        )
+
+
+class ClassSessionListView(generics.ListAPIView):
+    """A class's sessions, newest first (teacher/admin only)."""
+    serializer_class = ClassSessionSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+    def get_queryset(self):
+        queryset = ClassSession.objects.select_related('class_obj').order_by('-date', '-id')
+        if self.request.user.role == 'teacher':
+            queryset = queryset.filter(class_obj__teacher=self.request.user)
+
+        class_id = self.request.query_params.get('class_id')
+        date_from = self.request.query_params.get('date_from')
+        date_to = self.request.query_params.get('date_to')
+        if class_id:
+            queryset = queryset.filter(class_obj_id=class_id)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        return queryset
+
+
+class ScanAnomalyListView(generics.ListAPIView):
+    """Suspicious scan patterns found by ``manage.py analyze_scans``."""
+    serializer_class = ScanAnomalySerializer
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+    def get_queryset(self):
+        queryset = ScanAnomaly.objects.select_related('class_obj').order_by('-last_date', '-id')
+        if self.request.user.role == 'teacher':
+            queryset = queryset.filter(class_obj__teacher=self.request.user)
+
+        class_id = self.request.query_params.get('class_id')
+        kind = self.request.query_params.get('kind')
+        if class_id:
+            queryset = queryset.filter(class_obj_id=class_id)
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        return queryset
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """Ignore ?format=, which selects the export format rather than a DRF renderer."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportAttendanceView(ReplicaReadMixin, APIView):
+    """Export attendance as a streamed CSV, NDJSON, Arrow IPC or Parquet file."""
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    content_negotiation_class = ExportContentNegotiation
 
     def get(self, request):
+        export_format = request.query_params.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Unsupported format. Choose one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        encoder, content_type, extension, needs_pyarrow = EXPORT_FORMATS[export_format]
+        if needs_pyarrow and pyarrow is None:
+            return Response(
+                {'error': f'{export_format} export requires pyarrow, which is not installed'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
         class_id = request.query_params.get('class_id')
+        session_id = request.query_params.get('session_id')
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
 
-        queryset = Attendance.objects.all().order_by('attendance_date', 'student__name')
+        # Pinned explicitly: the rows are read while streaming, after dispatch
+        # (and its replica routing) has returned
+        queryset = Attendance.objects.using(replica_alias()).order_by('attendance_date', 'student__name')
 
         if request.user.role == 'teacher':
             queryset = queryset.filter(class_obj__teacher=request.user)
         if class_id:
             queryset = queryset.filter(class_obj_id=class_id)
+        if session_id:
+            queryset = queryset.filter(session_id=session_id)
         if date_from:
             queryset = queryset.filter(attendance_date__gte=date_from)
         if date_to:
             queryset = queryset.filter(attendance_date__lte=date_to)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="attendance_report.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Student Name', 'Email', 'Class', 'Date', 'Status', 'Marked At'])
-
-        for record in queryset.select_related('student', 'class_obj'):
-            writer.writerow([
-                record.student.name,
-                record.student.email,
-                record.class_obj.subject_name,
-                record.attendance_date,
-                record.status,
-                record.marked_at.strftime('%Y-%m-%d %H:%M:%S'),
-            ])
-
-        return response
+        # Streamed from a server-side cursor as tuples, so large exports
+        # neither buffer in memory nor block until the last row is read
+        return streaming_export_response(
+            request,
+            encoder(export_rows(queryset)),
+            content_type=content_type,
+            filename=f'attendance_report.{extension}',
+        )
 
 
-class DashboardStatsView(APIView):
-    """Dashboard statistics for admin/teacher."""
+class DashboardStatsView(ReplicaReadMixin, APIView):
+    """
+    Dashboard statistics for admin/teacher, cached per teacher (admins share
+    one entry) until attendance, enrollments or classes behind it change.
+    """
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
 
     def get(self, request):
+        today = date.today()
+        if request.user.role == 'teacher':
+            teacher_id = request.user.id
+            key = f'teacher:{teacher_id}:{today}'
+            scopes = [teacher_scope(teacher_id), STUDENT_SET]
+            scopes += [class_scope(class_id) for class_id in teacher_class_ids(teacher_id)]
+        else:
+            key = f'admin:{today}'
+            scopes = [ALL_CLASSES, CLASS_SET, STUDENT_SET]
+        return cached_response(request, 'dashboard', key, scopes, lambda: self.summarize(request.user, today))
+
+    @staticmethod
+    def summarize(user, today):
         from django.contrib.auth import get_user_model
         User = get_user_model()
 
-        if request.user.role == 'teacher':
-            classes = Class.objects.filter(teacher=request.user)
+        if user.role == 'teacher':
+            classes = Class.objects.filter(teacher=user)
         else:
             classes = Class.objects.all()
 
-        today = date.today()
-        today_attendance = Attendance.objects.filter(
-            attendance_date=today,
+        today_summary = AttendanceDailySummary.objects.filter(
+            date=today,
             class_obj__in=classes
+        ).aggregate(
+            present=Coalesce(Sum('present_count'), 0),
+            late=Coalesce(Sum('late_count'), 0),
+            absent=Coalesce(Sum('absent_count'), 0),
         )
 
         total_students = User.objects.filter(role='student').count()
         total_classes = classes.count()
-        today_present = today_attendance.filter(status='present').count()
-        today_late = today_attendance.filter(status='late').count()
-        today_absent = today_attendance.filter(status='absent').count()
+        today_present = today_summary['present']
+        today_late = today_summary['late']
+        today_absent = today_summary['absent']
 
-        return Response({
+        return {
             'total_students': total_students,
             'total_classes': total_classes,
             'today_present': today_present,
             'today_late': today_late,
             'today_absent': today_absent,
             'today_total': today_present + today_late + today_absent,
-        })
+        }
@@ -0,0 +1,56 @@
+"""
+Background threads for periodic maintenance jobs.
+
+Workers only start in processes that serve requests (on the first
+``request_started``), never in management commands like ``migrate``.
+"""
+import logging
+import threading
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker(threading.Thread):
+    """Daemon thread that calls ``func()`` every ``interval`` seconds until stopped."""
+
+    def __init__(self, name, interval, func):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.func = func
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            close_old_connections()
+            try:
+                self.func()
+            except Exception:
+                logger.exception('%s failed', self.name)
+            self._stop_event.wait(self.interval)
+        connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def start_worker(name, interval, func):
+    """Start the named worker once per process; later calls are no-ops."""
+    with _workers_lock:
+        if name not in _workers:
+            worker = PeriodicWorker(name, interval, func)
+            worker.start()
+            _workers[name] = worker
+        return _workers[name]
+
+
+def stop_workers():
+    with _workers_lock:
+        for worker in _workers.values():
+            worker.stop()
+        _workers.clear()
@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from classes.models import Class
+from classes.roster import RosterError, import_roster, parse_roster
+
+
+class Command(BaseCommand):
+    help = (
+        'Enroll a CSV or JSON roster of students (email, name, optional password) in a class, '
+        'creating accounts for emails that are not registered yet.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('class_id', type=int)
+        parser.add_argument('path', help='Roster file; the format is taken from the extension unless --format is given')
+        parser.add_argument('--format', choices=('csv', 'json'))
+        parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to hash new passwords (1 hashes in this process)')
+        parser.add_argument('--chunk-size', type=int, default=settings.ROSTER_IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            class_obj = Class.objects.get(pk=options['class_id'])
+        except Class.DoesNotExist:
+            raise CommandError(f'Class {options["class_id"]} does not exist')
+
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        try:
+            with open(options['path'], 'rb') as fh:
+                rows = parse_roster(fh.read(), fmt)
+        except (OSError, RosterError) as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        result = import_roster(
+            class_obj, rows,
+            hash_workers=options['hash_workers'],
+            chunk_size=options['chunk_size'],
+        )
+        for error in result['errors']:
+            where = f'row {error["row"]}' if error['row'] else error['email']
+            self.stderr.write(f'{where}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{class_obj}: {result["created"]} accounts created, {result["existing"]} existing, '
+            f'{result["enrolled"]} enrolled ({result["already_enrolled"]} already enrolled), '
+            f'{len(result["errors"])} rejected in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:04
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_session_counts(apps, schema_editor):
+    Class = apps.get_model('classes', 'Class')
+    Attendance = apps.get_model('attendance', 'Attendance')
+    sessions = Attendance.objects.values('class_obj').annotate(
+        n=Count('attendance_date', distinct=True),
+        last=Max('attendance_date'),
+    )
+    for row in sessions.iterator():
+        Class.objects.filter(pk=row['class_obj']).update(
+            session_count=row['n'],
+            last_session_date=row['last'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0001_initial'),
+        ('attendance', '0003_attendance_scan_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='last_session_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='session_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_session_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0002_class_session_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['class_obj'], include=('student',), name='idx_enrollment_class_roster'),
+        ),
+    ]
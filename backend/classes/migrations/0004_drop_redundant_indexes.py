@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='enrollment',
+            name='idx_enrollment_class_roster',
+        ),
+    ]
@@ -12,6 +12,11 @@ class Class(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Advanced by attendance.sessions.open_session when a session is opened (a
+    # rollup rebuild recounts it), so stats don't recount distinct dates
+    session_count = models.PositiveIntegerField(default=0)
+    last_session_date = models.DateField(blank=True, null=True)
+
     class Meta:
         db_table = 'classes'
         verbose_name_plural = 'classes'
@@ -34,6 +39,8 @@ class Enrollment(models.Model):
 
     class Meta:
         db_table = 'enrollments'
+        # Also serves lookups by student, e.g. AttendanceStatsView; lookups by
+        # class (roster loads) use the foreign key's index
         unique_together = ('student', 'class_obj')
 
     def __str__(self):
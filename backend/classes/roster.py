@@ -0,0 +1,187 @@
+"""
+Bulk roster import.
+
+A roster is a list of students (email, name and optionally a password) to
+enroll in one class. Emails already registered are looked up in a single
+query and reused; new student accounts and the enrollments are written with
+``bulk_create`` in chunks, inside one transaction. Students listed without a
+password get an unusable one and cannot log in until an admin sets one.
+
+Password hashing dominates the cost of creating accounts, so it can be
+spread over a process pool (``hash_workers``).
+"""
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import Enrollment
+from .signals import roster_changed
+
+User = get_user_model()
+
+MIN_PASSWORD_LENGTH = 8  # matches RegisterSerializer
+# Longer values would fail the whole bulk_create on backends that enforce them
+EMAIL_MAX_LENGTH = User._meta.get_field('email').max_length
+NAME_MAX_LENGTH = User._meta.get_field('name').max_length
+
+
+class RosterError(Exception):
+    """The roster as a whole could not be read."""
+
+
+def parse_roster(content, fmt):
+    """
+    Rows from CSV (header with ``email``, ``name`` and optional ``password``
+    columns) or a JSON list of objects with the same keys.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or 'email' not in [name.strip().lower() for name in reader.fieldnames]:
+            raise RosterError('CSV roster needs a header row with at least an "email" column.')
+        return [{(key or '').strip().lower(): value for key, value in row.items()} for row in reader]
+    if fmt == 'json':
+        try:
+            rows = json.loads(content)
+        except ValueError as exc:
+            raise RosterError(f'Invalid JSON roster: {exc}') from exc
+        if isinstance(rows, dict):
+            rows = rows.get('students')
+        if not isinstance(rows, list):
+            raise RosterError('JSON roster must be a list of students.')
+        return rows
+    raise RosterError(f'Unsupported roster format "{fmt}"; use csv or json.')
+
+
+def clean_rows(rows):
+    """
+    Validate and normalise roster rows.
+
+    Returns ``(students, errors)``: ``students`` maps each email to its
+    ``(name, password)`` (the first occurrence of a repeated email wins) and
+    ``errors`` lists ``{'row', 'email', 'error'}`` for rejected rows, with
+    rows numbered from 1.
+    """
+    students = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'email': None, 'error': 'Expected an object with email and name.'})
+            continue
+        email, name, password = (row.get(field) or '' for field in ('email', 'name', 'password'))
+        invalid = [field for field, value in (('email', email), ('name', name), ('password', password))
+                   if not isinstance(value, str)]
+        if invalid:
+            errors.append({'row': number, 'email': email if isinstance(email, str) else None,
+                           'error': f'{", ".join(invalid).capitalize()} must be text.'})
+            continue
+        email = User.objects.normalize_email(email.strip())
+        name = name.strip()
+        password = password or None
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append({'row': number, 'email': email, 'error': 'Invalid email address.'})
+            continue
+        if email in students:
+            continue
+        if len(email) > EMAIL_MAX_LENGTH:
+            errors.append({'row': number, 'email': email,
+                           'error': f'Email must be at most {EMAIL_MAX_LENGTH} characters.'})
+            continue
+        if len(name) > NAME_MAX_LENGTH:
+            errors.append({'row': number, 'email': email,
+                           'error': f'Name must be at most {NAME_MAX_LENGTH} characters.'})
+            continue
+        if password is not None and len(password) < MIN_PASSWORD_LENGTH:
+            errors.append({'row': number, 'email': email,
+                           'error': f'Password must be at least {MIN_PASSWORD_LENGTH} characters.'})
+            continue
+        students[email] = (name, password)
+    return students, errors
+
+
+def hash_passwords(passwords, workers=0):
+    """``make_password`` for each password, across ``workers`` processes if more than one."""
+    if workers > 1 and len(passwords) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    return [make_password(password) for password in passwords]
+
+
+def import_roster(class_obj, rows, hash_workers=0, chunk_size=None):
+    """
+    Create missing student accounts from ``rows`` and enroll everyone in ``class_obj``.
+
+    Returns a summary dict of counts plus the per-row ``errors``. Emails that
+    belong to a teacher or admin are reported as errors, not enrolled.
+    """
+    chunk_size = chunk_size or settings.ROSTER_IMPORT_CHUNK_SIZE
+    students, errors = clean_rows(rows)
+
+    existing = {
+        email: (user_id, role)
+        for email, user_id, role in User.objects.filter(email__in=students).values_list('email', 'id', 'role')
+    }
+    for email, (_, role) in existing.items():
+        if role != 'student':
+            errors.append({'row': None, 'email': email, 'error': f'Email belongs to a {role}, not a student.'})
+    new_emails = [email for email in students if email not in existing]
+    missing_names = [email for email in new_emails if not students[email][0]]
+    for email in missing_names:
+        errors.append({'row': None, 'email': email, 'error': 'Name is required for new students.'})
+    new_emails = [email for email in new_emails if students[email][0]]
+
+    hashes = hash_passwords([students[email][1] for email in new_emails], hash_workers)
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [
+                User(email=email, name=students[email][0], role='student', password=password_hash)
+                for email, password_hash in zip(new_emails, hashes)
+            ],
+            batch_size=chunk_size,
+            # A student registering mid-import keeps their account and gets enrolled
+            ignore_conflicts=True,
+        )
+        # Re-read ids rather than relying on bulk_create returning them, which
+        # depends on the backend and is skipped with ignore_conflicts
+        student_ids = list(
+            User.objects.filter(email__in=list(students), role='student').values_list('id', flat=True)
+        )
+        enrolled = set(
+            Enrollment.objects.filter(class_obj=class_obj, student_id__in=student_ids)
+            .values_list('student_id', flat=True)
+        )
+        to_enroll = [student_id for student_id in student_ids if student_id not in enrolled]
+        Enrollment.objects.bulk_create(
+            [Enrollment(class_obj=class_obj, student_id=student_id) for student_id in to_enroll],
+            batch_size=chunk_size,
+            ignore_conflicts=True,
+        )
+        # bulk_create skips post_save, so tell listeners (the scan roster and
+        # response caches) directly
+        transaction.on_commit(lambda: roster_changed.send(
+            sender=Enrollment, class_id=class_obj.id, student_ids=to_enroll,
+        ))
+
+    existing_students = sum(1 for _, role in existing.values() if role == 'student')
+    return {
+        'class_id': class_obj.id,
+        'rows': len(rows),
+        'students': len(students),
+        'created': len(student_ids) - existing_students,
+        'existing': len(existing),
+        'enrolled': len(to_enroll),
+        'already_enrolled': len(enrolled),
+        'errors': errors,
+    }
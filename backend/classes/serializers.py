@@ -15,7 +15,11 @@ class ClassSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
     def get_student_count(self, obj):
-        return obj.enrollments.count()
+        # List/detail querysets annotate the count; fall back for fresh instances
+        count = getattr(obj, 'student_count', None)
+        if count is None:
+            count = obj.enrollments.count()
+        return count
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with ``class_id`` and the newly enrolled ``student_ids`` after
+# enrollments are written in bulk, which skips the per-row post_save signal.
+roster_changed = Signal()
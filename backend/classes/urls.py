@@ -4,11 +4,13 @@ from .views import (
     ClassDetailView,
     EnrollmentListCreateView,
     EnrollmentDeleteView,
+    RosterImportView,
 )
 
 urlpatterns = [
     path('', ClassListCreateView.as_view(), name='class_list_create'),
     path('<int:pk>/', ClassDetailView.as_view(), name='class_detail'),
+    path('<int:pk>/roster/', RosterImportView.as_view(), name='roster_import'),
     path('enrollments/', EnrollmentListCreateView.as_view(), name='enrollment_list_create'),
     path('enrollments/<int:pk>/', EnrollmentDeleteView.as_view(), name='enrollment_delete'),
 ]
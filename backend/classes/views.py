@@ -1,11 +1,26 @@
+import os
+
+from django.conf import settings
+from django.db.models import Count
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from accounts.permissions import IsAdminOrTeacher
+from config.response_cache import (
+    ALL_CLASSES, CLASS_SET, cached_response, class_scope, query_key, student_class_ids, student_scope,
+    teacher_class_ids, teacher_scope,
+)
 from .models import Class, Enrollment
+from .roster import RosterError, import_roster, parse_roster
 from .serializers import ClassSerializer, EnrollmentSerializer
 
 
+def annotated_classes():
+    """Classes with the teacher joined and the enrollment count annotated."""
+    return Class.objects.select_related('teacher').annotate(student_count=Count('enrollments'))
+
+
 class ClassListCreateView(generics.ListCreateAPIView):
     """List all classes or create a new class."""
     serializer_class = ClassSerializer
@@ -13,12 +28,35 @@ class ClassListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = annotated_classes()
         if user.role in ('admin', 'teacher'):
             if user.role == 'teacher':
-                return Class.objects.filter(teacher=user)
-            return Class.objects.all()
-        # Students see only enrolled classes
-        return Class.objects.filter(enrollments__student=user)
+                return queryset.filter(teacher=user)
+            return queryset
+        # Students see only enrolled classes. Filter through a subquery so the
+        # join doesn't narrow the annotated enrollment count to one row.
+        return queryset.filter(
+            id__in=Enrollment.objects.filter(student=user).values('class_obj_id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Cached, with conditional GET validators, per user (admins share
+        # entries) until a listed class or its enrollments change, or the set
+        # of classes the user sees does
+        user = request.user
+        if user.role == 'teacher':
+            owner = f'teacher:{user.id}'
+            scopes = [teacher_scope(user.id)] + [class_scope(class_id) for class_id in teacher_class_ids(user.id)]
+        elif user.role == 'student':
+            owner = f'student:{user.id}'
+            scopes = [student_scope(user.id)] + [class_scope(class_id) for class_id in student_class_ids(user.id)]
+        else:
+            owner = 'admin'
+            scopes = [ALL_CLASSES, CLASS_SET]
+        return cached_response(
+            request, 'class_list', f'{owner}@{query_key(request)}', scopes,
+            lambda: super(ClassListCreateView, self).list(request, *args, **kwargs).data,
+        )
 
     def perform_create(self, serializer):
         if self.request.user.role == 'teacher':
@@ -31,7 +69,9 @@ class ClassDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a class."""
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
-    queryset = Class.objects.all()
+
+    def get_queryset(self):
+        return annotated_classes()
 
 
 class EnrollmentListCreateView(generics.ListCreateAPIView):
@@ -40,7 +80,7 @@ class EnrollmentListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Enrollment.objects.all()
+        queryset = Enrollment.objects.select_related('student', 'class_obj')
         class_id = self.request.query_params.get('class_id')
         if class_id:
             queryset = queryset.filter(class_obj_id=class_id)
@@ -54,3 +94,42 @@ class EnrollmentDeleteView(generics.DestroyAPIView):
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
     queryset = Enrollment.objects.all()
+
+
+class RosterImportView(APIView):
+    """
+    Bulk-enroll students in a class, creating accounts for new emails.
+
+    Send a CSV or JSON roster as the ``file`` upload, or a JSON body of
+    ``{"students": [{"email", "name", "password"?}, ...]}``.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+    def post(self, request, pk):
+        classes = Class.objects.filter(pk=pk)
+        if request.user.role == 'teacher':
+            classes = classes.filter(teacher=request.user)
+        class_obj = classes.first()
+        if class_obj is None:
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = os.path.splitext(upload.name)[1].lstrip('.').lower() or 'csv'
+                rows = parse_roster(upload.read(), fmt)
+            else:
+                rows = request.data.get('students')
+                if not isinstance(rows, list):
+                    raise RosterError('Send a roster file or a "students" list.')
+        except RosterError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.ROSTER_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f'At most {settings.ROSTER_IMPORT_MAX_ROWS} students per request; '
+                          'use `manage.py import_roster` for larger rosters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = import_roster(class_obj, rows, hash_workers=settings.ROSTER_HASH_WORKERS)
+        return Response(result, status=status.HTTP_201_CREATED if result['enrolled'] else status.HTTP_200_OK)
@@ -1,8 +1,15 @@
 """
 ASGI config for Smart Attendance System.
+
+Besides the Django app, serves the live attendance stream
+(``/api/attendance/stream/<class_id>/``) over SSE and WebSockets.
 """
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from attendance.streams import stream_router  # noqa: E402  (needs apps loaded)
+
+application = stream_router(django_application)
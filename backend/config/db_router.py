@@ -0,0 +1,67 @@
+"""
+Read-replica routing.
+
+When a ``replica`` database alias is configured (DB_REPLICA_HOST), views
+using ReplicaReadMixin run their GET requests against it, so reports and
+exports don't compete with scan writes on the primary. Everything else,
+including every write, stays on ``default``. Replica reads can lag the
+primary by the replication delay, so only views that tolerate slightly
+stale data opt in.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+def replica_alias():
+    """The alias reads should use inside ``replica_reads()``: the replica if configured."""
+    return REPLICA_DB_ALIAS if REPLICA_DB_ALIAS in connections.databases else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def replica_reads():
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Route reads to the replica inside ``replica_reads()``; all writes go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return replica_alias()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe (read-only) requests from the replica.
+
+    Querysets evaluated after the view returns, such as a streamed export,
+    must be pinned with ``.using(replica_alias())`` themselves.
+    """
+    replica_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.replica_methods:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,222 @@
+"""
+In-process request metrics.
+
+MetricsMiddleware times every request per view and method. For a
+METRICS_SAMPLE_RATE share of requests it also counts SQL queries and
+measures database time and the time spent building serializer ``.data``.
+Everything is aggregated into histograms held in this process and exposed
+in Prometheus text format at ``/api/metrics/`` (admins only).
+
+Each worker process keeps its own numbers. Streaming responses (exports) are
+timed until the view returns, not until the last chunk is sent.
+"""
+import contextvars
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdmin
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Named counters and histograms, keyed by label values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (type, help, buckets, {labels: value})
+
+    def counter(self, name, help_text):
+        self._metrics.setdefault(name, ('counter', help_text, None, {}))
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS):
+        self._metrics.setdefault(name, ('histogram', help_text, tuple(buckets), {}))
+
+    def inc(self, name, amount=1, **labels):
+        _, _, _, series = self._metrics[name]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        _, _, buckets, series = self._metrics[name]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            for _, _, _, series in self._metrics.values():
+                series.clear()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets, series) in sorted(self._metrics.items()):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in sorted(series.items()):
+                    if kind == 'counter':
+                        lines.append(f'{name}{_labels(key)} {value}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets, value.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(key, le=_number(bound))} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {value.count}')
+                    lines.append(f'{name}_sum{_labels(key)} {_number(value.sum)}')
+                    lines.append(f'{name}_count{_labels(key)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+registry.counter('http_requests_total', 'Requests handled, by view, method and status code.')
+registry.histogram('http_request_duration_seconds', 'Wall time spent in the middleware stack and view.')
+registry.histogram('db_queries_per_request', 'SQL queries issued per sampled request.', QUERY_BUCKETS)
+registry.histogram('db_duration_seconds', 'Time spent executing SQL per sampled request.')
+registry.histogram('serializer_duration_seconds', 'Time spent building serializer data per sampled request.')
+
+
+class RequestSample:
+    """Per-request accumulator; also the database execute wrapper."""
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+_current_sample = contextvars.ContextVar('current_sample', default=None)
+_serializer_timing_installed = False
+
+
+def install_serializer_timing():
+    """Time ``BaseSerializer.data`` for sampled requests; nested serializers count once."""
+    global _serializer_timing_installed
+    if _serializer_timing_installed:
+        return
+    original = BaseSerializer.data.fget
+
+    def data(self):
+        sample = _current_sample.get()
+        if sample is None or sample.serializing:
+            return original(self)
+        sample.serializing = True
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            sample.serializer_time += time.perf_counter() - started
+            sample.serializing = False
+
+    BaseSerializer.data = property(data)
+    _serializer_timing_installed = True
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None) or match.func
+    return getattr(view, '__name__', match.view_name)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.METRICS_SAMPLE_RATE
+        install_serializer_timing()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            response = self.get_response(request)
+            self.record(request, response, time.perf_counter() - started)
+            return response
+
+        sample = RequestSample()
+        token = _current_sample.set(sample)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+        self.record(request, response, time.perf_counter() - started, sample)
+        return response
+
+    @staticmethod
+    def record(request, response, duration, sample=None):
+        labels = {'view': view_label(request), 'method': request.method}
+        registry.inc('http_requests_total', status=response.status_code, **labels)
+        registry.observe('http_request_duration_seconds', duration, **labels)
+        if sample is not None:
+            registry.observe('db_queries_per_request', sample.queries, **labels)
+            registry.observe('db_duration_seconds', sample.db_time, **labels)
+            registry.observe('serializer_duration_seconds', sample.serializer_time, **labels)
+
+
+class MetricsView(APIView):
+    """Prometheus scrape endpoint for this process's metrics (admin only)."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
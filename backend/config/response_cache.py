@@ -0,0 +1,211 @@
+"""
+Versioned response cache and conditional GET for read-heavy views.
+
+Every cached response is stored under a key that embeds the current version
+of each *scope* it was computed from: a class, a student, a teacher's set of
+classes, the set of all classes or the set of student accounts. Writes bump
+the versions of the scopes they touch (signal receivers in the attendance and
+accounts apps, plus explicit calls on bulk paths that skip signals), so the
+next request misses and recomputes; nothing has to be deleted or guessed
+with a short TTL. RESPONSE_CACHE_SECONDS only bounds how long an entry may
+live, e.g. when it was computed from a replica that lagged behind the write.
+
+``cached_response`` also serves conditional GETs. Each entry stores a digest
+of its payload, used as the ETag, and the time it was computed, used as
+Last-Modified. A request whose If-None-Match (or, without one,
+If-Modified-Since) still matches the current entry gets 304 Not Modified
+without anything being queried or serialized. Because the validators
+describe the payload rather than the versions, a payload computed from a
+lagging replica stops validating once it is recomputed. Last-Modified only
+has one-second resolution, so clients should prefer the ETag.
+
+Entries and versions live in the ``responses`` cache alias. With the default per-process
+locmem backend a write only invalidates the worker that made it; use a file
+or Redis backend (RESPONSE_CACHE_BACKEND) to share entries and versions.
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from classes.models import Class, Enrollment
+from .metrics import registry
+
+CACHE_ALIAS = 'responses'
+VERSION_KEY = 'rc:v:{}'
+ENTRY_KEY = 'rc:{}:{}'
+
+# Bumped along with any class, for views that depend on every class
+ALL_CLASSES = 'classes:all'
+# Bumped when classes are created or deleted
+CLASS_SET = 'classes:set'
+# Bumped when student accounts are created, deleted or change role
+STUDENT_SET = 'students:set'
+
+registry.counter(
+    'response_cache_requests_total',
+    'Response cache lookups, by view and result (hit, miss or not_modified).',
+)
+
+
+def class_scope(class_id):
+    return f'class:{class_id}'
+
+
+def student_scope(student_id):
+    return f'student:{student_id}'
+
+
+def teacher_scope(teacher_id):
+    return f'teacher:{teacher_id}'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _digest(key, scope_versions):
+    # Hashed so query strings stay within backend key limits
+    return hashlib.blake2b(':'.join([str(key), *scope_versions]).encode(), digest_size=16).hexdigest()
+
+
+def bump(*scopes):
+    """Give each scope a new version, orphaning entries computed under the old one."""
+    if scopes:
+        _cache().set_many({VERSION_KEY.format(scope): _new_version() for scope in scopes}, timeout=None)
+
+
+def invalidate(classes=(), students=(), teachers=(), class_set=False, student_set=False):
+    """
+    Bump the scopes a write touched, once its transaction commits (a reader
+    recomputing before then would cache the old data under the new version).
+    """
+    scopes = [class_scope(class_id) for class_id in set(classes)]
+    scopes += [student_scope(student_id) for student_id in set(students)]
+    scopes += [teacher_scope(teacher_id) for teacher_id in set(teachers)]
+    if scopes:
+        scopes.append(ALL_CLASSES)
+    if class_set:
+        scopes.append(CLASS_SET)
+    if student_set:
+        scopes.append(STUDENT_SET)
+    if scopes:
+        transaction.on_commit(lambda: bump(*scopes))
+
+
+def invalidate_all():
+    """Drop every cached response, e.g. after rebuilding rollups."""
+    transaction.on_commit(lambda: _cache().clear())
+
+
+def versions(scopes):
+    """Current version of each scope; scopes never bumped (or evicted) get one now."""
+    cache = _cache()
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # add() so concurrent first readers agree on one version
+            cache.add(key, _new_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def cached(view, key, scopes, compute):
+    """
+    ``compute()``'s result for ``key``, reused until one of ``scopes`` is
+    bumped. Hits and misses are counted per ``view``.
+    """
+    if settings.RESPONSE_CACHE_SECONDS <= 0:
+        return compute()
+    return _lookup(view, _digest(key, versions(scopes)), compute)
+
+
+def _payload_etag(view, data):
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(f'{view}-{hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()}')
+
+
+def cached_response(request, view, key, scopes, compute):
+    """
+    Like ``cached``, but returns the Response, with ETag and Last-Modified
+    validators describing the payload. A conditional request the cached
+    payload still satisfies gets 304 without ``compute()``.
+    """
+    if settings.RESPONSE_CACHE_SECONDS <= 0:
+        data = compute()
+        etag, last_modified = _payload_etag(view, data), None
+    else:
+        etag, last_modified, data = _lookup(
+            view, _digest(key, versions(scopes)),
+            lambda: _with_validators(view, compute()),
+        )
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = Response(data)
+    elif response.status_code == 304:
+        # (or 412 for a failed If-Match/If-Unmodified-Since)
+        registry.inc('response_cache_requests_total', view=view, result='not_modified')
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Per-user content: private, and revalidated on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def _with_validators(view, data):
+    return _payload_etag(view, data), int(time.time()), data
+
+
+def _lookup(view, digest, compute):
+    entry_key = ENTRY_KEY.format(view, digest)
+    cache = _cache()
+    data = cache.get(entry_key)
+    if data is not None:
+        registry.inc('response_cache_requests_total', view=view, result='hit')
+        return data
+    registry.inc('response_cache_requests_total', view=view, result='miss')
+    data = compute()
+    cache.set(entry_key, data, settings.RESPONSE_CACHE_SECONDS)
+    return data
+
+
+def teacher_class_ids(teacher_id):
+    """Ids of the teacher's classes, cached until the teacher's set of classes changes."""
+    return cached(
+        'teacher_classes', teacher_id, [teacher_scope(teacher_id)],
+        lambda: list(Class.objects.filter(teacher_id=teacher_id).values_list('id', flat=True)),
+    )
+
+
+def student_class_ids(student_id):
+    """Ids of the student's enrolled classes, cached until their enrollments change."""
+    return cached(
+        'student_classes', student_id, [student_scope(student_id)],
+        lambda: list(Enrollment.objects.filter(student_id=student_id).values_list('class_obj_id', flat=True)),
+    )
+
+
+def query_key(request):
+    """
+    The request's host and query string in a stable order, for views that
+    filter or paginate (pagination links are absolute URLs).
+    """
+    query = '&'.join(f'{name}={value}' for name, value in sorted(request.query_params.items()))
+    return f'{request.get_host()}?{query}'
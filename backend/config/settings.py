@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -42,6 +43,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Share of requests that also get SQL and serializer timing in /api/metrics/
+# (wall time and request counts are always recorded)
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=1.0 if DEBUG else 0.1, cast=float)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -63,15 +68,37 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database — PostgreSQL
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.sqlite3 (with DB_NAME as a file path) works for local benchmarks
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('DB_NAME', default='smart_attendance'),
         'USER': config('DB_USER', default='postgres'),
         'PASSWORD': config('DB_PASSWORD', default='password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Keep connections open across requests instead of reconnecting each
+        # time; health checks replace ones the server dropped. Put PgBouncer
+        # in front when workers times this exceeds max_connections.
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica for report views (see config.db_router). For a local
+# check, point it at the primary's database and run `manage.py check_db_routing`.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        # Tests read the replica's data through the primary connection
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -86,7 +113,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -104,6 +131,35 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Tokens without role/name/email claims are resolved from the database and
+# the result cached this long
+AUTH_USER_CACHE_SECONDS = config('AUTH_USER_CACHE_SECONDS', default=300, cast=int)
+
+# Holds user state that overrides stale token claims. Token claims are only
+# trusted when this is shared between worker processes (e.g. Redis or
+# Memcached); with locmem every request resolves its user from the database,
+# cached per process for AUTH_USER_CACHE_SECONDS
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+    # Cached report responses (config/response_cache.py). locmem keeps them
+    # per process; FileBasedCache (LOCATION = a directory) or RedisCache
+    # (LOCATION = redis://...) share them, and their invalidation, between workers
+    'responses': {
+        'BACKEND': config('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default='responses'),
+    },
+}
+if CACHES['responses']['BACKEND'].endswith(('LocMemCache', 'FileBasedCache')):
+    # Only these backends cull; Redis and Memcached reject the option
+    CACHES['responses']['OPTIONS'] = {'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=10000, cast=int)}
+
+# Upper bound on a cached response's life; writes invalidate entries sooner.
+# 0 disables response caching.
+RESPONSE_CACHE_SECONDS = config('RESPONSE_CACHE_SECONDS', default=300, cast=int)
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -130,6 +186,64 @@ CORS_ALLOW_HEADERS = [
 # QR Code Settings
 QR_EXPIRY_SECONDS = config('QR_EXPIRY_SECONDS', default=120, cast=int)
 LATE_THRESHOLD_SECONDS = config('LATE_THRESHOLD_SECONDS', default=900, cast=int)  # 15 minutes
+# 'database' stores a QRToken row per code; 'signed' issues HMAC-signed codes
+# that scans verify without a database read. Signed codes are revoked through
+# a denylist in the default cache, so signed mode needs a shared CACHE_BACKEND
+# when several processes serve requests (system check attendance.E001).
+QR_TOKEN_MODE = config('QR_TOKEN_MODE', default='database')
+# Automatic rotation: successors are issued this long before a token expires,
+# and outgoing tokens stay valid this much longer for scans in flight
+QR_ROTATION_LEAD_SECONDS = config('QR_ROTATION_LEAD_SECONDS', default=10, cast=int)
+QR_ROTATION_GRACE_SECONDS = config('QR_ROTATION_GRACE_SECONDS', default=15, cast=int)
+QR_ROTATION_INTERVAL_SECONDS = config('QR_ROTATION_INTERVAL_SECONDS', default=5, cast=int)
+# Longest a class may ask to be rotated for (rotate_minutes), about a teaching day
+QR_ROTATION_MAX_MINUTES = config('QR_ROTATION_MAX_MINUTES', default=720, cast=int)  # 12 hours
+# Run the rotation scheduler inside web processes instead of `manage.py run_qr_rotation`
+QR_ROTATION_IN_PROCESS = config('QR_ROTATION_IN_PROCESS', default=False, cast=bool)
+# Offline scans may be replayed this long after their token stopped being valid
+OFFLINE_SCAN_MAX_AGE_SECONDS = config('OFFLINE_SCAN_MAX_AGE_SECONDS', default=86400, cast=int)  # 24 hours
+OFFLINE_SCAN_BATCH_SIZE = config('OFFLINE_SCAN_BATCH_SIZE', default=500, cast=int)
+
+# Stale data reaper: deletes expired QR tokens (once past the offline replay
+# window) and, if a retention window is set, moves older attendance into
+# per-student counters in attendance_archive. 0 keeps attendance forever.
+ATTENDANCE_RETENTION_DAYS = config('ATTENDANCE_RETENTION_DAYS', default=0, cast=int)
+REAPER_BATCH_SIZE = config('REAPER_BATCH_SIZE', default=1000, cast=int)
+REAPER_INTERVAL_SECONDS = config('REAPER_INTERVAL_SECONDS', default=300, cast=int)
+# Run the reaper inside web processes instead of `manage.py reap_stale_data`
+REAPER_IN_PROCESS = config('REAPER_IN_PROCESS', default=False, cast=bool)
+
+# Absent marking (`manage.py close_sessions`). A session is closed once all of
+# the day's QR codes expired this long ago, or the day is over; sessions older
+# than the lookback are left alone unless closed explicitly with --date.
+SESSION_CLOSE_GRACE_SECONDS = config('SESSION_CLOSE_GRACE_SECONDS', default=900, cast=int)  # 15 minutes
+SESSION_CLOSE_LOOKBACK_DAYS = config('SESSION_CLOSE_LOOKBACK_DAYS', default=2, cast=int)
+SESSION_CLOSE_BATCH_SIZE = config('SESSION_CLOSE_BATCH_SIZE', default=1000, cast=int)
+SESSION_CLOSE_INTERVAL_SECONDS = config('SESSION_CLOSE_INTERVAL_SECONDS', default=60, cast=int)
+# Close sessions inside web processes instead of `manage.py close_sessions`
+SESSION_CLOSE_IN_PROCESS = config('SESSION_CLOSE_IN_PROCESS', default=False, cast=bool)
+
+# Proxy-attendance analysis (`manage.py analyze_scans`). Patterns are looked
+# for within the last ANOMALY_WINDOW_DAYS. Raise ANOMALY_IP_MIN_STUDENTS if
+# a campus puts every student behind one NAT address.
+ANOMALY_WINDOW_DAYS = config('ANOMALY_WINDOW_DAYS', default=28, cast=int)
+ANOMALY_DEVICE_MIN_STUDENTS = config('ANOMALY_DEVICE_MIN_STUDENTS', default=2, cast=int)
+ANOMALY_IP_MIN_STUDENTS = config('ANOMALY_IP_MIN_STUDENTS', default=8, cast=int)
+ANOMALY_CLUSTER_MIN_STUDENTS = config('ANOMALY_CLUSTER_MIN_STUDENTS', default=3, cast=int)
+ANOMALY_CLUSTER_SECONDS = config('ANOMALY_CLUSTER_SECONDS', default=60, cast=int)
+ANOMALY_BATCH_SIZE = config('ANOMALY_BATCH_SIZE', default=5000, cast=int)
+
+# Bulk roster import (POST /api/classes/<id>/roster/, `manage.py import_roster`).
+# Hashing passwords dominates large imports; the command can spread it over
+# processes with --hash-workers, the endpoint uses ROSTER_HASH_WORKERS.
+ROSTER_IMPORT_CHUNK_SIZE = config('ROSTER_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+ROSTER_IMPORT_MAX_ROWS = config('ROSTER_IMPORT_MAX_ROWS', default=5000, cast=int)
+ROSTER_HASH_WORKERS = config('ROSTER_HASH_WORKERS', default=0, cast=int)
+
+# Live dashboard events (QR rotations, scans). The in-process broker only
+# reaches stream clients connected to the same process, so rotation events
+# from a standalone `run_qr_rotation` need a cross-process broker.
+ATTENDANCE_BROKER = config('ATTENDANCE_BROKER', default='attendance.realtime.InProcessBroker')
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
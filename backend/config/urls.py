@@ -4,9 +4,12 @@ URL configuration for Smart Attendance System.
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/classes/', include('classes.urls')),
     path('api/attendance/', include('attendance.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]